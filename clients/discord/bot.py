@@ -1,35 +1,65 @@
 import asyncio, time, tempfile
+import aiohttp
 import discord
 from discord import app_commands
-from utils import environment
+from utils import environment, metrics
 import psutil, tracemalloc
 from io import BytesIO
 from utils.database import Database
-import clients.discord.messages as messages
 from .commands import define_commands
-from .ui_elements import FooterButtons
 from .events import setup_events
+from .subscriptions import SubscriptionIndex
+from .dispatcher import Dispatcher
+from .outbox import NotificationOutbox
+from .render import RenderedNotification
+from .permissions import PermissionCache, PermissionStatus
+from .cdn import MediaCDN
+from .notices import PermissionNoticeLedger, UserCache
 
 logger = environment.logging.getLogger("bot.discord")
 
 
-class MyClient(discord.Client):
+class MyClient(discord.AutoShardedClient):
     def __init__(self, modules) -> None:
         self.modules = modules
         intents = discord.Intents.none()
         intents.guilds = True
         self.ADMIN_USER = None
         self.DEV_GUILD = None
+        self.subscriptions = SubscriptionIndex()
+        self.permissions = PermissionCache()
+        self.notices = PermissionNoticeLedger(environment.PERMISSION_NOTICE_COOLDOWN)
+        self.owners = UserCache(self)
+        self.cdn = MediaCDN(self)
+        self.dispatcher = Dispatcher(
+            max_rate=float(environment.NOTIFICATION_RATE_LIMIT or 50),
+            concurrency=int(environment.NOTIFICATION_CONCURRENCY or environment.NOTIFICATION_BATCH_SIZE or 10)
+        )
+        shard_count = environment.DISCORD_SHARD_COUNT
+        shard_ids = None
+        if environment.CLUSTER_COUNT > 1:
+            if shard_count is None:
+                raise ValueError("DISCORD_SHARD_COUNT must be set when running in cluster mode")
+            shard_ids = [shard_id for shard_id in range(shard_count) if shard_id % environment.CLUSTER_COUNT == environment.CLUSTER_ID]
+            logger.info("Cluster %s/%s owns shards %s", environment.CLUSTER_ID, environment.CLUSTER_COUNT, shard_ids)
         super().__init__(
             intents = intents,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            http_trace=self.dispatcher.trace_config(),
             max_messages=None,
             member_cache_flags=discord.MemberCacheFlags.none(),
             chunk_guilds_at_startup=False,
             activity = discord.Activity(type=discord.ActivityType.watching, name="Looking out for free games")
         )
         self.tree = app_commands.CommandTree(self)
+        self.webhook_session: aiohttp.ClientSession | None = None
 
     async def setup_hook(self) -> None:
+        self.webhook_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=int(environment.NOTIFICATION_CONCURRENCY or 100), ttl_dns_cache=300),
+            trace_configs=[self.dispatcher.trace_config(client='webhook', report_rate_limits=False)]
+        )
         self.DEV_GUILD = discord.Object(id=environment.DISCORD_DEV_GUILD) if environment.DISCORD_DEV_GUILD is not None and environment.DEVELOPMENT else None
         try:
             env_value = environment.DISCORD_ADMIN_ACC
@@ -49,9 +79,22 @@ class MyClient(discord.Client):
         else:
             await self.tree.sync()
 
+    def owns_guild(self, guild_id: int) -> bool:
+        '''
+        Whether the guild is on one of the shards of this process, always True outside cluster mode.
+        '''
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    async def close(self) -> None:
+        await super().close()
+        if self.webhook_session and not self.webhook_session.closed:
+            await self.webhook_session.close()
+
 
     # MARK: check_permissions 
-    def check_channel_permissions(self, channel) -> dict:
+    def check_channel_permissions(self, channel) -> PermissionStatus:
         """
         Checks if the bot has the required permissions in a given channel and returns detailed information about the permissions.
 
@@ -59,75 +102,20 @@ class MyClient(discord.Client):
             channel (discord.TextChannel): The Discord text channel to check.
 
         Returns:
-            dict: A dictionary containing:
+            PermissionStatus: An object containing:
             - 'has_all_permissions' (bool): True if the bot has all required permissions, otherwise False.
-            - 'permission_details' (dict): A dictionary where keys are permissions and values are booleans indicating permissions status.
+            - 'permission_details' (discord.Permissions): The bot permissions in the channel.
             - 'embed' (discord.Embed): An embed message listing the permissions and their statuses (✅ or ❌).
+            - 'text_message' (str): The same message as plain text.
 
         Notes:
             - The method checks the following permissions: 'view_channel', 'send_messages', 'embed_links', 'attach_files'.
-            - If the bot does not have the required permissions, the embed will list each permission's status and provide instructions for updating permissions.
-            - If the channel does not exist, the method will return a message indicating so.
+            - Results are cached per channel and invalidated by channel, role and member update events.
+            - The embed and text message are only built when accessed.
+            - If the channel does not exist, the embed will contain a message indicating so.
         """
         assert self.user is not None, "Bot user is None"
-        #  It is possible for system channel not to exist on a guild.
-        if channel is None:
-            # object to match discords API response to channel permissions
-            class PermissionDetails:
-                def __init__(self) -> None:
-                    self.view_channel = False
-                    self.send_messages = False
-                    self.embed_links = False
-                    self.attach_files = False
-
-            msg = (f"The selected channel does not exist, or {self.user.mention} can't access it. "
-                    "To fix this, update your settings using the `/settings` command with a valid channel, "
-                    "and ensure the bot has access to it.")
-
-            embed = discord.Embed(
-                title="❌ Channel Not Found",
-                description= msg,
-                color=0xff0000
-            )
-            embed.set_thumbnail(url="https://5okin.github.io/mercurybot-web/images/mercury_avatar.gif")
-            msg = f"**❌ Channel Not Found**\n{msg}\n"
-            return {"has_all_permissions": False, "permission_details": PermissionDetails(), "embed": embed, "text_message": msg}
-
-        guild = channel.guild
-        required_permissions  = ['view_channel', 'send_messages', 'embed_links', 'attach_files']
-        bot_permissions = channel.permissions_for(guild.me)
-        has_all_permissions = all(getattr(bot_permissions, perm, False) for perm in required_permissions)
-
-        permissions_status = [
-            f"{'✅' if getattr(bot_permissions, perm, False) else '❌'} {perm.replace('_', ' ').title()}"
-            for perm in required_permissions
-        ]
-        permissions_message = "\n".join(permissions_status)
-
-        msg_d = "I don't have all the required permission to send messages to the selected channel."
-        msg_f = "I need at least the following permissions to work correctly"
-        msg_e_t = "To change channel permissions:"
-        msg_e_d = "Click on the 3 dots next to the channel name / Edit channel / Permissions"
-        msg_g = "Please update channel permissions and try again"
-        embed = discord.Embed(title="🔒 Missing permissions 🔒", description=f"{msg_d}", color=0xff0000)
-        embed.add_field(name="​", value="", inline=False)
-        embed.add_field(name=msg_f, value=f"\n{permissions_message}\n", inline=False)
-        embed.add_field(name="​", value="", inline=False)
-        embed.add_field(name=msg_e_t, value=msg_e_d, inline=False)
-        embed.set_footer(text=msg_g)
-        embed.set_thumbnail(url="https://5okin.github.io/mercurybot-web/images/mercury_avatar.gif")
-
-        text_message = f"**{embed.title}**\n{embed.description}\n"
-        for field in embed.fields:
-            text_message += f"**{field.name}** {field.value}\n"
-
-        permission_status = {
-            "has_all_permissions": has_all_permissions,
-            "permission_details": bot_permissions,
-            "embed": embed,
-            "text_message": text_message
-        }
-        return permission_status
+        return self.permissions.get(channel, self.user.mention)
 
 
     #MARK: dm_logs
@@ -143,7 +131,7 @@ class MyClient(discord.Client):
             await self.ADMIN_USER.send(f"**{logTitle}** {logPayload}")
 
 
-    def create_discord_file_from_bytesio(self, image: BytesIO, image_type: str) -> discord.File:
+    async def create_discord_file_from_bytesio(self, image: BytesIO, image_type: str) -> discord.File:
         """
         Writes a BytesIO image to a temporary file and returns a discord.File for sending discord notifications.
 
@@ -151,38 +139,116 @@ class MyClient(discord.Client):
         :param image_type: Image format/extension (e.g., 'PNG', 'JPEG', 'GIF')
         :return: discord.File ready to be sent
         """
-        image.seek(0)
         ext = 'jpg' if image_type.upper() == 'JPEG' else image_type.lower()
 
-        tmp_file = tempfile.NamedTemporaryFile(suffix='.' + ext, delete=False)
-        tmp_file.write(image.read())
-        tmp_file.flush()
-        tmp_file.seek(0)
+        def write_temp_file() -> str:
+            with tempfile.NamedTemporaryFile(suffix='.' + ext, delete=False) as tmp_file:
+                tmp_file.write(image.getvalue())
+                return tmp_file.name
 
-        return discord.File(tmp_file.name, filename=f'img.{ext}')
+        return discord.File(await asyncio.to_thread(write_temp_file), filename=f'img.{ext}')
     
-    #MARK: upload_image_to_cdn
-    async def upload_image_to_cdn(self, store) -> str | None:
-        buffer = BytesIO(store.image.getvalue())
-        file = discord.File(fp=buffer, filename=f'img.{store.image_type.lower()}')
+    #MARK: webhooks
+    async def create_notification_webhook(self, channel: discord.TextChannel) -> str | None:
+        '''
+        Creates the webhook notifications are delivered through for the given channel.
 
-        if not self.ADMIN_USER:
+        Returns:
+            The webhook url, or None when the bot isn't allowed to manage webhooks in the channel.
+        '''
+        if not channel.permissions_for(channel.guild.me).manage_webhooks:
+            return None
+        try:
+            webhook = await channel.create_webhook(name="MercuryBot", reason="MercuryBot game notifications")
+            return webhook.url
+        except discord.HTTPException:
+            logger.info("Could not create webhook for %s", channel.guild.id, extra={'_channel': channel.id})
             return None
 
-        message = await self.ADMIN_USER.send(file=file)
-        return message.attachments[0].url
+    async def delete_notification_webhook(self, webhook_url: str | None) -> None:
+        if not webhook_url:
+            return
+        try:
+            await discord.Webhook.from_url(webhook_url, session=self.webhook_session, client=self).delete(reason="Notification channel changed")
+        except discord.HTTPException:
+            pass
+
+    async def send_through_webhook(self, rendered: RenderedNotification, server_id: int, webhook_url: str, role: str | None) -> bool:
+        '''
+        Sends a notification through the guild webhook.
+
+        Returns False when the webhook send failed and the caller falls back to channel.send.
+        A webhook that is gone or not allowed anymore is also removed from the guild settings.
+        '''
+        assert self.user is not None, "Bot user is None"
+        webhook = discord.Webhook.from_url(webhook_url, session=self.webhook_session, client=self)
+        try:
+            await rendered.send(
+                webhook.send,
+                role,
+                username=self.user.name,
+                avatar_url=self.user.display_avatar.url,
+                wait=True
+            )
+            return True
+        except (discord.NotFound, discord.Forbidden):
+            logger.info("Webhook for %s is gone, falling back to channel messages", server_id)
+            self.subscriptions.upsert(server_id, webhook=None)
+            await asyncio.to_thread(Database.insert_discord_server, [{'server': server_id, 'webhook': None}])
+            return False
+        except discord.HTTPException as e:
+            logger.warning("Webhook send for %s failed with %s, falling back to channel messages", server_id, e.status)
+            return False
+
+    #MARK: upload_image_to_cdn
+    async def upload_image_to_cdn(self, store, image_bytes: bytes | None = None) -> str | None:
+        '''
+        Returns a CDN url of the store image, the image is only uploaded if its bytes weren't before.
+        '''
+        if image_bytes is None:
+            image = await store.media('discord')
+            if image is None:
+                return None
+            image_bytes = image.getvalue()
+        try:
+            return await self.cdn.url_for(image_bytes, store.image_type)
+        except discord.HTTPException:
+            logger.warning("Failed to upload %s image to the CDN", store.name)
+            return None
 
     # MARK: send notifications
-    async def send_notifications(self, store) -> None:
+    async def send_notifications(self, store, resume: bool = False) -> None:
+        '''
+        Fan out the notification of a store update to every subscribed server.
+
+        Parameters:
+            store (store object): The updated store.
+            resume (bool): Only deliver the outbox jobs left pending by a previous run, used after a restart.
+                A fan-out that was owed but never started is started from scratch.
+        '''
         await self.wait_until_ready()
+        await self.subscriptions.wait_until_built()
+        deal_hash = store.deal_hash()
+        if not deal_hash:
+            return
+        outbox = NotificationOutbox(store.name, deal_hash)
+        if resume:
+            resume = await outbox.has_jobs()
+            if not resume and not await outbox.is_owed():
+                return
+            if resume and not await outbox.has_pending():
+                await outbox.mark_handled()
+                return
+
+        image = await store.media('discord')
+        if not image:
+            return
+        image_bytes = image.getvalue()
         start_time = time.time()
-        logger.info("Started sending Discord notifications...")
-        servers_data = Database.get_discord_servers()
-        servers_notified = 0
-        BATCH_SIZE = int(environment.NOTIFICATION_BATCH_SIZE or 1)
-    
-        image_bytes = store.image.getvalue()
-        image_type = store.image_type
+        servers_data = self.subscriptions.subscribers(store.id)
+
+        store.image_cdn = await self.upload_image_to_cdn(store, image_bytes)
+        rendered = RenderedNotification(store, store.image_cdn, image_bytes)
 
         def all_new_deals_are_low_quality(games: list[dict])-> bool:
             new_deals = [
@@ -194,18 +260,24 @@ class MyClient(discord.Client):
                 and all(game.get('type') == 'low_quality' for game in new_deals)
             )
 
+        delivered, undeliverable = [], []
+
         async def send_message(server) -> bool:
-            file, buffer = None, None
+            send_start = time.perf_counter()
             try:
-                if store.image_cdn:
-                    file = store.image_cdn
-                else:
-                    buffer = BytesIO(image_bytes)
-                    file = discord.File(fp=buffer, filename=f'img.{image_type.lower()}')
-
-                await self.store_messages(store.name, server.get('server'), server.get('channel'), server.get('role'), file)
-                return True
+                sent = await self.store_messages(
+                    rendered, server.get('server'), server.get('channel'), server.get('role'), server.get('webhook'),
+                    nonce=outbox.nonce(server.get('server'))
+                )
+                metrics.notification_send_seconds.observe(time.perf_counter() - send_start, store=store.name)
+                metrics.notifications_total.inc(store=store.name, result='delivered' if sent else 'undeliverable')
+                (delivered if sent else undeliverable).append(server.get('server'))
+                await outbox.complete(server.get('server'), sent)
+                return sent
             except Exception:
+                undeliverable.append(server.get('server'))
+                metrics.notification_send_seconds.observe(time.perf_counter() - send_start, store=store.name)
+                metrics.notifications_total.inc(store=store.name, result='failed')
                 logger.error("Failed to send notification", 
                     extra={
                     '_store_name': getattr(store, 'name', 'unknown'),
@@ -214,18 +286,16 @@ class MyClient(discord.Client):
                     '_server_channel': server.get('channel', 'unknown'),
                     }
                 )
+                await outbox.complete(server.get('server'), False)
                 return False
-            finally:
-                if buffer:
-                    buffer.close()
 
         only_low_quality = all_new_deals_are_low_quality(store.data)
 
         servers_eligible = [
             server for server in servers_data
             if (
-                store.id in str(server.get('notification_settings')) 
-                and server.get('channel')
+                server.get('channel')
+                and not server.get('parked')
                 and not (
                     server.get('skip_low_quality', False)
                     and only_low_quality
@@ -237,109 +307,176 @@ class MyClient(discord.Client):
                 '_store_name': store.name,
                 '_only_low_quality': only_low_quality,
             })
+            await outbox.mark_handled()
             return
 
-        batch_stats = []
-        for i in range(0, len(servers_eligible), BATCH_SIZE):
-            batch = servers_eligible[i:i + BATCH_SIZE]
-            batch_start = time.time()
-            
-            tasks = [send_message(server) for server in batch]
-            results = await asyncio.gather(*tasks)
-            
-            batch_time = time.time() - batch_start
-            servers_notified += sum(results)
-
-            batch_stats.append({
-                # "batch": i // BATCH_SIZE + 1,
-                # "attempted": len(batch),
-                # "notified": sum(results),
-                "time": batch_time,
-            })
+        pending = await outbox.prepare([server['server'] for server in servers_eligible], resume=resume)
+        servers_pending = [server for server in servers_eligible if server['server'] in pending]
+        if not servers_pending:
+            logger.debug("No pending notifications for %s", store.name)
+            return
 
-        end_time = time.time()
+        logger.info("%s Discord notifications...", "Resuming" if resume else "Started sending", extra={
+            '_store_name': store.name,
+            '_pending': f"{len(servers_pending)}/{len(servers_eligible)}"
+        })
+        result = await self.dispatcher.run(servers_pending, send_message, uses_global=lambda server: not server.get('webhook'))
+        if store.image_cdn is None and rendered.image_url:
+            # Uploaded as an attachment by the first send, reuse it for the next fan-out
+            store.image_cdn = rendered.image_url
+            await self.cdn.remember(self.cdn.content_hash(image_bytes), rendered.image_url)
+        await self.record_delivery_results(delivered, undeliverable)
+        metrics.fanout_span_seconds.observe(result.delivery_span, store=store.name)
+        metrics.fanout_throughput.set(result.throughput, store=store.name)
+        metrics.subscribed_guilds.set(len(self.subscriptions))
 
         logger.info("Finished sending Discord notifications", 
             extra={
                 "_store_name": store.name,
-                "_total_batches": len(batch_stats),
-                "_total_servers": len(servers_data),
-                "_total_notified": f"{servers_notified}/{len(servers_eligible)}",
-                "_total_time": f"{end_time - start_time:.2f}s",
-                "_Avg_batch_time": f"{sum(b['time'] for b in batch_stats) / len(batch_stats):.2f}s"
+                "_total_servers": len(self.subscriptions),
+                "_total_notified": f"{result.delivered}/{len(servers_pending)}",
+                "_total_time": f"{time.time() - start_time:.2f}s",
+                "_throughput": f"{result.throughput:.2f}/s",
+                "_delivery_span": f"{result.delivery_span:.2f}s",
+                "_rate_limited": result.rate_limited,
+                "_send_rate": f"{self.dispatcher.rate:.2f}/s"
             }
         )
 
 
+    # MARK: delivery failures
+    async def record_delivery_results(self, delivered: list[int], undeliverable: list[int]) -> None:
+        '''
+        Tracks consecutive delivery failures per server. Servers that reach
+        NOTIFICATION_PARK_THRESHOLD are parked, they are left out of the fan-out until
+        a settings change or a gateway event shows they may be deliverable again.
+        '''
+        states = {}
+        for server_id in undeliverable:
+            record = self.subscriptions.get(server_id)
+            if record is None:
+                continue
+            failures = (record.get('failures') or 0) + 1
+            parked = failures >= environment.NOTIFICATION_PARK_THRESHOLD
+            if parked and not record.get('parked'):
+                logger.info("Parking undeliverable server %s", server_id, extra={
+                    '_server_name': record.get('server_name'),
+                    '_failures': failures
+                })
+            self.subscriptions.upsert(server_id, failures=failures, parked=parked)
+            states[server_id] = {'failures': failures, 'parked': parked}
+
+        for server_id in delivered:
+            record = self.subscriptions.get(server_id)
+            if record and record.get('failures'):
+                self.subscriptions.upsert(server_id, failures=0, parked=False)
+                states[server_id] = {'failures': 0, 'parked': False}
+
+        if states:
+            try:
+                await asyncio.to_thread(Database.update_delivery_state, states)
+            except Exception:
+                logger.error("Failed to save delivery failures", extra={'_servers': len(states)})
+
+    async def unpark(self, server_id: int) -> None:
+        '''
+        Resets the delivery failures of a server so it's part of the next fan-out again.
+        '''
+        record = self.subscriptions.get(server_id)
+        if not record or not (record.get('failures') or record.get('parked')):
+            return
+        self.subscriptions.upsert(server_id, failures=0, parked=False)
+        await asyncio.to_thread(Database.update_delivery_state, {server_id: {'failures': 0, 'parked': False}})
+
+
     # MARK: store_messages
-    async def store_messages(self, command, server_id: int, channel_id: int, role_id: int | None, file: discord.File | None) -> None:
-        for store in self.modules:
-            if command == store.name:
-                message_to_show = getattr(messages, store.name, messages.default)
-                server = self.get_guild(server_id)
-                if store.data and server:
-                    channel = self.get_channel(channel_id)
-
-                    role = None
-                    if role_id and role_id == server.default_role.id:
-                        role = '@everyone'
-                    elif role_id:
-                        role = f' <@&{role_id}>'
-
-                    default_txt = f'{store.service_name} has new free games'
-                    permissions = self.check_channel_permissions(channel)
-
-                    if permissions['has_all_permissions']:
-
-                        if isinstance(file, discord.File):
-                            embed = message_to_show(store)
-                        else:
-                            embed = message_to_show(store, file)
-                            file = None
-
-                        if isinstance(channel, discord.TextChannel):
-                            await channel.send(
-                                default_txt + f' {role}' if role else default_txt, 
-                                embed=embed,
-                                view=FooterButtons(),
-                                file=file # type: ignore
-                            )
-
-                    # Check if you can send a permissions notification msg to selected channel
-                    elif permissions['permission_details'].send_messages:
-                        if isinstance(channel, discord.TextChannel):
-                            await channel.send(content=permissions['text_message'])
-
-                    else:
-                        # Check if you can send permissions notification embed or msg to system channel
-                        if server.system_channel and server.system_channel.permissions_for(server.me).embed_links:
-                            await server.system_channel.send(embed=permissions['embed'])
-                        elif server.system_channel and server.system_channel.permissions_for(server.me).send_messages:
-                            await server.system_channel.send(content=permissions['text_message'])
-
-                        # Try sending permissions notification msg to server owner as dm
-                        else:
-                            if server.owner_id is not None:
-                                owner = await self.fetch_user(server.owner_id)
-                            else:
-                                logger.warning("Server owner ID is None for server %s", server.id)
-                                return
-                            try:
-                                await owner.send(
-                                    f"Hello {owner.name}, we noticed that the bot does not have all the required permissions for **{server.name}**.\n"
-                                    "The bot is unable to send game notifications without these permissions !!\n"
-                                    "Please update the bot settings from your server using the `/settings` command and removing and re-adding the desired channel 😊")
-                            except discord.Forbidden:
-                                # Try sending permissions notification msg to any server channel:
-                                logger.info("Could not DM the server owner %s: %s.", owner.name, server.owner_id, extra={
-                                    '_channel': channel,
-                                    '_store_name': getattr(store, 'name', 'unkown'),
-                                    '_server_name':server.name,
-                                    '_server_id': server.id,
-                                })
-                                for public_channel in server.text_channels:
-                                    if public_channel.permissions_for(server.me).send_messages:
-                                        await public_channel.send(content=permissions['text_message'])
-                                        logger.info("Send permission notification for %s to public channel", server.id)
-                                        return
-                                logger.warning("Failed to notify server %s for permission problems", server.id)
+    async def store_messages(
+        self,
+        rendered: RenderedNotification,
+        server_id: int,
+        channel_id: int,
+        role_id: int | None,
+        webhook_url: str | None = None,
+        nonce: str | None = None
+    ) -> bool:
+        '''
+        Sends the store notification to a server, or a permissions warning when it can't be delivered.
+        A channel message with a `nonce` is only created once, webhooks don't support nonces.
+
+        Returns:
+            True if the notification was posted, False if the destination is undeliverable.
+        '''
+        store = rendered.store
+        server = self.get_guild(server_id)
+        if not (store.data and server):
+            return False
+
+        channel = self.get_channel(channel_id)
+
+        role = None
+        if role_id and role_id == server.default_role.id:
+            role = '@everyone'
+        elif role_id:
+            role = f' <@&{role_id}>'
+
+        # Webhooks have their own rate limits, channel.send stays the fallback
+        if webhook_url and await self.send_through_webhook(rendered, server_id, webhook_url, role):
+            return True
+
+        permissions = self.check_channel_permissions(channel)
+
+        if permissions.has_all_permissions:
+            if isinstance(channel, discord.TextChannel):
+                await rendered.send(channel.send, role, nonce=nonce)
+                return True
+
+        # Each broken server gets at most one warning per cooldown window
+        if not self.notices.due(server.id):
+            return False
+        await self.send_permission_notice(server, channel, permissions, store)
+        await self.notices.record(server.id)
+        return False
+
+    async def send_permission_notice(self, server: discord.Guild, channel, permissions: PermissionStatus, store) -> None:
+        '''
+        Warns a server about missing permissions, trying the selected channel, the system
+        channel, the server owner and finally any public channel.
+        '''
+        # Check if you can send a permissions notification msg to selected channel
+        if permissions.permission_details.send_messages:
+            if isinstance(channel, discord.TextChannel):
+                await channel.send(content=permissions.text_message)
+            return
+
+        # Check if you can send permissions notification embed or msg to system channel
+        if server.system_channel and server.system_channel.permissions_for(server.me).embed_links:
+            await server.system_channel.send(embed=permissions.embed)
+        elif server.system_channel and server.system_channel.permissions_for(server.me).send_messages:
+            await server.system_channel.send(content=permissions.text_message)
+
+        # Try sending permissions notification msg to server owner as dm
+        else:
+            if server.owner_id is not None:
+                owner = await self.owners.get(server.owner_id)
+            else:
+                logger.warning("Server owner ID is None for server %s", server.id)
+                return
+            try:
+                await owner.send(
+                    f"Hello {owner.name}, we noticed that the bot does not have all the required permissions for **{server.name}**.\n"
+                    "The bot is unable to send game notifications without these permissions !!\n"
+                    "Please update the bot settings from your server using the `/settings` command and removing and re-adding the desired channel 😊")
+            except discord.Forbidden:
+                # Try sending permissions notification msg to any server channel:
+                logger.info("Could not DM the server owner %s: %s.", owner.name, server.owner_id, extra={
+                    '_channel': channel,
+                    '_store_name': getattr(store, 'name', 'unkown'),
+                    '_server_name':server.name,
+                    '_server_id': server.id,
+                })
+                for public_channel in server.text_channels:
+                    if public_channel.permissions_for(server.me).send_messages:
+                        await public_channel.send(content=permissions.text_message)
+                        logger.info("Send permission notification for %s to public channel", server.id)
+                        return
+                logger.warning("Failed to notify server %s for permission problems", server.id)
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+import discord
+from discord.http import Route
+from utils.database import Database
+from utils import environment
+
+logger = environment.logging.getLogger("bot.discord")
+
+# Urls that expire sooner than this are refreshed before they're used
+REFRESH_MARGIN = timedelta(hours=1)
+
+
+def url_expiry(url: str) -> datetime | None:
+    '''
+    Returns when a Discord attachment url expires, from its hex `ex` parameter.
+    '''
+    try:
+        expiry = parse_qs(urlparse(url).query).get('ex')
+        return datetime.fromtimestamp(int(expiry[0], 16), timezone.utc) if expiry else None
+    except ValueError:
+        return None
+
+
+# MARK: MediaCDN
+class MediaCDN:
+    '''
+    Discord CDN urls of uploaded media, keyed by the sha256 of the bytes.
+
+    The same bytes are only uploaded once, urls close to their expiry are refreshed
+    through /attachments/refresh-urls and known urls are saved in the database so
+    they survive a restart.
+    '''
+    def __init__(self, client: discord.Client) -> None:
+        self.client = client
+        self._urls: dict[str, str] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def is_fresh(url: str) -> bool:
+        expiry = url_expiry(url)
+        # Urls without an expiry don't need refreshing
+        return expiry is None or expiry - datetime.now(timezone.utc) > REFRESH_MARGIN
+
+    async def url_for(self, data: bytes, image_type: str) -> str | None:
+        '''
+        Returns a usable CDN url for the bytes, uploading them only if no url is known.
+
+        Ask for the url before every use: a saved url may be about to expire, e.g. after
+        a restart, and is then refreshed here.
+        '''
+        content_hash = self.content_hash(data)
+        async with self._locks.setdefault(content_hash, asyncio.Lock()):
+            url = self._urls.get(content_hash)
+            if url is None:
+                url = await asyncio.to_thread(Database.get_cdn_url, content_hash)
+            if url and self.is_fresh(url):
+                self._urls[content_hash] = url
+                return url
+
+            if url:
+                refreshed = await self.refresh(url)
+                if refreshed:
+                    await self.remember(content_hash, refreshed)
+                    return refreshed
+
+            url = await self.upload(data, image_type)
+            if url:
+                await self.remember(content_hash, url)
+            return url
+
+    async def remember(self, content_hash: str, url: str) -> None:
+        self._urls[content_hash] = url
+        try:
+            await asyncio.to_thread(Database.save_cdn_url, content_hash, url)
+        except Exception:
+            logger.warning("Failed to save CDN url")
+
+    async def refresh(self, url: str) -> str | None:
+        try:
+            response = await self.client.http.request(
+                Route('POST', '/attachments/refresh-urls'), json={'attachment_urls': [url]}
+            )
+        except discord.HTTPException as e:
+            logger.info("Failed to refresh CDN url: %s", e)
+            return None
+        refreshed = response.get('refreshed_urls') or []
+        return refreshed[0].get('refreshed') if refreshed else None
+
+    async def upload(self, data: bytes, image_type: str) -> str | None:
+        admin_user = getattr(self.client, 'ADMIN_USER', None)
+        if not admin_user:
+            return None
+        file = discord.File(fp=BytesIO(data), filename=f'img.{image_type.lower()}')
+        message = await admin_user.send(file=file)
+        logger.info("Uploaded %s bytes to the CDN", len(data))
+        return message.attachments[0].url
@@ -24,7 +24,7 @@ def define_commands(self) -> None:
 
         for store in self.modules:
             if store_choice.value == store.name:
-                payload = build_deal_payload(store, mobile=mobile)
+                payload = await build_deal_payload(store, mobile=mobile)
                 if payload is None:
                     await interaction.response.send_message(f"No free games on {store.name}", ephemeral=True)
                     return
@@ -60,7 +60,7 @@ def define_commands(self) -> None:
                 await interaction.response.defer(thinking=True, ephemeral=True)
 
             view = Settings_buttons(self)
-            embed = settings_embed(self, interaction)
+            embed = await settings_embed(self, interaction)
             message: WebhookMessage | None = await interaction.followup.send(embed=embed, view=view, ephemeral=True)
             if message is None:
                 raise Exception("Failed to send settings message")
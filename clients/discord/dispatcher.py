@@ -0,0 +1,220 @@
+import asyncio
+import time
+import aiohttp
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, TypeVar
+from utils import environment, metrics
+
+logger = environment.logging.getLogger("bot.discord")
+
+T = TypeVar('T')
+
+
+# MARK: TokenBucket
+class TokenBucket:
+    """
+    Token bucket that hands out `rate` tokens per second with bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for the given number of seconds and drains the bucket.
+        """
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # The lock keeps waiters in FIFO order so no send starves.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class DispatchResult:
+    attempted: int = 0
+    delivered: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+    first_delivery: float | None = None
+    last_delivery: float | None = None
+
+    @property
+    def throughput(self) -> float:
+        return self.attempted / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def delivery_span(self) -> float:
+        """
+        Seconds between the first and the last delivery.
+        """
+        if self.first_delivery is None or self.last_delivery is None:
+            return 0.0
+        return self.last_delivery - self.first_delivery
+
+
+# MARK: Dispatcher
+class Dispatcher:
+    """
+    Keeps a steady number of sends in flight, paced by a token bucket sized to
+    Discord's global rate limit.
+
+    On a 429 the send rate is halved (once per second at most), a global 429 also
+    pauses the bucket for `retry_after`, and every second of clean sends adds
+    `increase` requests per second back until `max_rate` is reached again.
+    Per-route buckets are still handled by discord.py, which only holds up the
+    send that hit them and not the other in-flight ones.
+    """
+    RETRY_WINDOW = 10.0
+
+    def __init__(self, max_rate: float = 50, concurrency: int = 10, min_rate: float = 1, increase: float = 1) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(max_rate)
+        self._rate_limited = 0
+        self._last_decrease = 0.0
+        self._clean_sends = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def on_rate_limited(self, retry_after: float, is_global: bool = False) -> None:
+        """
+        Slows the dispatcher down after a 429.
+        """
+        self._rate_limited += 1
+        self._clean_sends = 0
+        now = time.monotonic()
+        if now - self._last_decrease >= 1:
+            self._last_decrease = now
+            self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+            logger.warning("Rate limited, lowering send rate to %.2f/s", self.bucket.rate, extra={
+                '_retry_after': retry_after,
+                '_global': is_global
+            })
+        if is_global:
+            self.bucket.pause(retry_after)
+
+    def _on_sent(self) -> None:
+        if self.bucket.rate >= self.max_rate:
+            return
+        self._clean_sends += 1
+        if self._clean_sends >= self.bucket.rate:
+            self._clean_sends = 0
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.increase)
+
+    def trace_config(self, client: str = 'bot', report_rate_limits: bool = True) -> aiohttp.TraceConfig:
+        """
+        Returns an aiohttp trace config that reports the 429s discord.py receives
+        back to the dispatcher. Pass it to the client as `http_trace`.
+
+        403, 429 and 5xx responses are also counted in the metrics, together with
+        the retries discord.py makes after a 429 or a 500/502/504. A retry is only
+        counted when the same request is sent again, so the last failed attempt,
+        which discord.py gives up on, isn't.
+        """
+        # (method, url) -> deadline of the retry discord.py may send after a 429/5xx
+        retry_candidates: dict[tuple[str, str], float] = {}
+
+        async def on_request_start(session, context, params) -> None:
+            deadline = retry_candidates.pop((params.method, str(params.url)), None)
+            if deadline is not None and deadline >= time.monotonic():
+                metrics.discord_retries_total.inc(client=client)
+
+        async def on_request_end(session, context, params) -> None:
+            response = params.response
+            if response.status in (403, 429) or response.status >= 500:
+                metrics.discord_responses_total.inc(client=client, status=response.status)
+            if response.status in (429, 500, 502, 504):
+                now = time.monotonic()
+                for key in [key for key, deadline in retry_candidates.items() if deadline < now]:
+                    del retry_candidates[key]
+                try:
+                    wait = float(response.headers.get('Retry-After', 0)) if response.status == 429 else 0.0
+                except ValueError:
+                    wait = 0.0
+                # discord.py waits Retry-After on a 429 and at most 9s between 5xx attempts
+                retry_candidates[(params.method, str(params.url))] = now + wait + self.RETRY_WINDOW
+
+            if not report_rate_limits:
+                return
+            # 'shared' 429s come from a resource limit that isn't ours to back off from
+            if response.status != 429 or response.headers.get('X-RateLimit-Scope') == 'shared':
+                return
+            try:
+                retry_after = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                retry_after = 1.0
+            self.on_rate_limited(retry_after, response.headers.get('X-RateLimit-Global') == 'true')
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    async def run(
+        self,
+        items: Iterable[T],
+        send: Callable[[T], Awaitable[bool]],
+        uses_global: Callable[[T], bool] | None = None
+    ) -> DispatchResult:
+        """
+        Calls `send` for every item, keeping `concurrency` sends in flight.
+
+        `send` returns True when the item was delivered. Items for which `uses_global`
+        returns False (e.g. webhook executions) don't take a token from the global bucket.
+        """
+        queue: asyncio.Queue[T] = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        result = DispatchResult()
+        rate_limited_before = self._rate_limited
+        start_time = time.monotonic()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if uses_global is None or uses_global(item):
+                    await self.bucket.acquire()
+                result.attempted += 1
+                if await send(item):
+                    result.delivered += 1
+                    result.last_delivery = time.monotonic()
+                    if result.first_delivery is None:
+                        result.first_delivery = result.last_delivery
+                    self._on_sent()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, queue.qsize()))))
+
+        result.elapsed = time.monotonic() - start_time
+        result.rate_limited = self._rate_limited - rate_limited_before
+        return result
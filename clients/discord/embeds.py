@@ -1,9 +1,10 @@
+import asyncio
 import discord
 from utils.database import Database
 
 
-def settings_embed(client, interaction, change_note=None) -> discord.Embed:
-    server = Database.get_discord_server(interaction.guild_id)
+async def settings_embed(client, interaction, change_note=None) -> discord.Embed:
+    server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
     channel = '<#'+str(server.get('channel'))+'>' if server and server.get('channel') else '`None`'
     assert server is not None, "Interaction guild is None"
     
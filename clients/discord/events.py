@@ -1,5 +1,6 @@
 import os
 import asyncio
+import discord
 from utils.database import Database
 from datetime import datetime
 from utils import environment
@@ -15,13 +16,18 @@ def setup_events(client):
     async def on_ready():
         client.add_view(FooterButtons())
         # Check if connected to all guilds stored in db, only applicable if removed while bot was offline
-        servers_data = Database.get_discord_servers()
+        # In cluster mode only the guilds on this process' shards are handled here
+        servers_data = [server for server in await asyncio.to_thread(Database.get_discord_servers) if client.owns_guild(server['server'])]
         guild_ids = [server.id for server in client.guilds]
         servers_data_ids = [server['server'] for server in servers_data]
 
         not_in_guilds = [server for server in servers_data_ids if server not in guild_ids]
         for guild in not_in_guilds:
-            Database.remove_server(guild)
+            await asyncio.to_thread(Database.remove_server, guild)
+
+        removed = set(not_in_guilds)
+        client.subscriptions.build(server for server in servers_data if server['server'] not in removed)
+        client.notices.load(server for server in servers_data if server['server'] not in removed)
 
         # Update server populations
         BATCH_SIZE = 500
@@ -72,7 +78,7 @@ def setup_events(client):
         default_channel = None
 
         # Try to send on join message to system channel
-        if guild.system_channel and permissions['has_all_permissions']:
+        if guild.system_channel and permissions.has_all_permissions:
             await guild.system_channel.send(msg)
             default_channel = guild.system_channel.id
 
@@ -96,14 +102,17 @@ def setup_events(client):
                 logger.warning("Could not send welcome message using any method for %s", guild.id,
                             extra={'_error:': e})
         
-        Database.insert_discord_server([{
+        await asyncio.to_thread(Database.insert_discord_server, [{
             'server': guild.id,
             'channel': default_channel,
             'server_name': guild.name,
             'joined': datetime.now(),
             'population': guild.member_count,
-            'notification_settings': 1
+            'notification_settings': 1,
+            'failures': 0,
+            'parked': False
         }])
+        client.subscriptions.upsert(guild.id, server_name=guild.name, channel=default_channel, notification_settings=1, failures=0, parked=False)
 
 
     # MARK: on_guild_remove
@@ -111,7 +120,10 @@ def setup_events(client):
     async def on_guild_remove(guild):
         if getattr(guild, "unavailable", False):
             return
-        Database.remove_server(guild.id)
+        await asyncio.to_thread(Database.remove_server, guild.id)
+        client.subscriptions.remove(guild.id)
+        client.notices.forget(guild.id)
+        client.permissions.invalidate_guild(guild.id)
         try:
             if guild.owner:
                 await guild.owner.send(
@@ -120,3 +132,34 @@ def setup_events(client):
                 )
         except Exception as e:
             logger.info("Failed to send feedback request to guild owner")
+
+
+    # MARK: permission cache invalidation
+    # These events can also make a parked server deliverable again, so they unpark it
+    @client.event
+    async def on_guild_channel_update(before, after):
+        # Category overwrites can change the permissions of every channel synced to it
+        if isinstance(after, discord.CategoryChannel):
+            client.permissions.invalidate_guild(after.guild.id)
+        else:
+            client.permissions.invalidate_channel(after.guild.id, after.id)
+        await client.unpark(after.guild.id)
+
+    @client.event
+    async def on_guild_channel_delete(channel):
+        client.permissions.invalidate_channel(channel.guild.id, channel.id)
+
+    @client.event
+    async def on_guild_role_update(before, after):
+        client.permissions.invalidate_guild(after.guild.id)
+        await client.unpark(after.guild.id)
+
+    @client.event
+    async def on_guild_role_delete(role):
+        client.permissions.invalidate_guild(role.guild.id)
+
+    @client.event
+    async def on_member_update(before, after):
+        if client.user and after.id == client.user.id:
+            client.permissions.invalidate_guild(after.guild.id)
+            await client.unpark(after.guild.id)
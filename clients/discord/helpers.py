@@ -6,12 +6,12 @@ from utils import environment
 logger = environment.logging.getLogger("bot.discord")
 
 
-def build_deal_payload(store, mobile: bool = False):
+async def build_deal_payload(store, mobile: bool = False):
     if store.data and any(game.get("activeDeal", False) for game in store.data):
         message_to_show = getattr(messages, store.name, messages.default)
-        if isinstance(store.image, io.BytesIO):
-            store.image.seek(0)
-            file = discord.File(store.image, filename="img." + store.image_type.lower())
+        image = await store.media('discord')
+        if isinstance(image, io.BytesIO):
+            file = discord.File(io.BytesIO(image.getvalue()), filename="img." + store.image_type.lower())
             return {
                 "embed": message_to_show(store, mobile=mobile),
                 "file": file,
@@ -0,0 +1,68 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import discord
+from utils.database import Database
+from utils import environment
+
+logger = environment.logging.getLogger("bot.discord")
+
+
+# MARK: PermissionNoticeLedger
+class PermissionNoticeLedger:
+    """
+    Remembers when each guild was last warned about missing permissions, so a broken
+    guild gets at most one warning per cooldown window instead of one per store update.
+    """
+    def __init__(self, cooldown: float) -> None:
+        self.cooldown = timedelta(seconds=cooldown)
+        self._last_notice: dict[int, datetime] = {}
+
+    def load(self, documents) -> None:
+        self._last_notice = {
+            document['server']: document['permission_notice']
+            for document in documents
+            if document.get('server') is not None and document.get('permission_notice')
+        }
+
+    def due(self, server_id: int) -> bool:
+        last_notice = self._last_notice.get(server_id)
+        if last_notice is None:
+            return True
+        if last_notice.tzinfo is None:
+            last_notice = last_notice.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - last_notice >= self.cooldown
+
+    async def record(self, server_id: int) -> None:
+        now = datetime.now(timezone.utc)
+        self._last_notice[server_id] = now
+        try:
+            await asyncio.to_thread(Database.set_permission_notice, server_id, now)
+        except Exception:
+            logger.warning("Failed to save permission notice for %s", server_id)
+
+    def forget(self, server_id: int) -> None:
+        self._last_notice.pop(server_id, None)
+
+
+# MARK: UserCache
+class UserCache:
+    """
+    LRU cache of `discord.User` objects, used for server owners that aren't in the member cache.
+    """
+    def __init__(self, client: discord.Client, maxsize: int = 256) -> None:
+        self.client = client
+        self.maxsize = maxsize
+        self._users: OrderedDict[int, discord.User] = OrderedDict()
+
+    async def get(self, user_id: int) -> discord.User:
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+            return user
+
+        user = self.client.get_user(user_id) or await self.client.fetch_user(user_id)
+        self._users[user_id] = user
+        if len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+        return user
@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+from utils.database import Database
+from utils import environment
+
+logger = environment.logging.getLogger("bot.discord")
+
+
+class NotificationOutbox:
+    """
+    Persistent outbox of one store update's fan-out.
+
+    Every guild gets a job keyed by (store, deal hash, guild) in MongoDB, so a
+    restart in the middle of a fan-out picks up the guilds that are still pending
+    instead of skipping them or notifying everyone twice.
+
+    A job is marked done as soon as its send returns, so only the sends that were
+    in flight during a crash are repeated on resume. Channel messages carry a nonce
+    derived from the job key, which Discord enforces, so a repeated channel send
+    doesn't create a second message.
+    """
+    def __init__(self, store_name: str, deal_hash: str) -> None:
+        self.store_name = store_name
+        self.deal_hash = deal_hash
+
+    async def is_owed(self) -> bool:
+        """
+        True if the update was published (saved with the deals) but this cluster hasn't
+        enqueued or skipped its fan-out yet, e.g. after a restart right after the save.
+        """
+        return await asyncio.to_thread(Database.fanout_owed, self.store_name, self.deal_hash)
+
+    async def has_jobs(self) -> bool:
+        return await asyncio.to_thread(Database.has_notifications, self.store_name, self.deal_hash)
+
+    async def has_pending(self) -> bool:
+        return bool(await asyncio.to_thread(Database.pending_notifications, self.store_name, self.deal_hash))
+
+    async def mark_handled(self) -> None:
+        """
+        Records that this cluster doesn't owe the fan-out anymore, the outbox jobs take over.
+        """
+        await asyncio.to_thread(Database.mark_update_handled, self.store_name, self.deal_hash)
+
+    async def prepare(self, server_ids, resume: bool = False) -> set:
+        """
+        Returns the server ids still pending for this update.
+
+        A new update replaces every job of the store, even when the deals are the same
+        as an earlier update. Resuming keeps the jobs that were already delivered and
+        only drops the ones of older updates.
+        """
+        if resume:
+            await asyncio.to_thread(Database.drop_stale_notifications, self.store_name, self.deal_hash)
+        else:
+            await asyncio.to_thread(Database.replace_notifications, self.store_name, self.deal_hash, server_ids)
+        await self.mark_handled()
+        return await asyncio.to_thread(Database.pending_notifications, self.store_name, self.deal_hash)
+
+    def nonce(self, server_id) -> str:
+        """
+        Message nonce of a job, Discord nonces are at most 25 characters.
+        """
+        key = Database.outbox_key(self.store_name, self.deal_hash, server_id)
+        return hashlib.sha1(key.encode()).hexdigest()[:25]
+
+    async def complete(self, server_id, delivered: bool) -> None:
+        key = Database.outbox_key(self.store_name, self.deal_hash, server_id)
+        try:
+            await asyncio.to_thread(Database.complete_notifications, [key], 'sent' if delivered else 'failed')
+        except Exception:
+            logger.error("Failed to update notification outbox", extra={
+                '_store_name': self.store_name,
+                '_server_id': server_id
+            })
@@ -0,0 +1,114 @@
+import time
+import discord
+from functools import cached_property
+
+REQUIRED_PERMISSIONS = ['view_channel', 'send_messages', 'embed_links', 'attach_files']
+AVATAR_URL = "https://5okin.github.io/mercurybot-web/images/mercury_avatar.gif"
+
+
+class MissingPermissions:
+    """
+    Object to match discords API response to channel permissions, used when the channel doesn't exist.
+    """
+    def __init__(self) -> None:
+        self.view_channel = False
+        self.send_messages = False
+        self.embed_links = False
+        self.attach_files = False
+
+
+# MARK: PermissionStatus
+class PermissionStatus:
+    """
+    Permissions of the bot in a channel.
+
+    The warning embed and text message are only built when they are first used,
+    which only happens when a permission is missing.
+    """
+    def __init__(self, bot_mention: str, channel, permissions=None) -> None:
+        self.bot_mention = bot_mention
+        self.channel = channel
+        self.permission_details = permissions if permissions is not None else MissingPermissions()
+        self.has_all_permissions = channel is not None and all(
+            getattr(self.permission_details, perm, False) for perm in REQUIRED_PERMISSIONS
+        )
+
+    @cached_property
+    def embed(self) -> discord.Embed:
+        #  It is possible for system channel not to exist on a guild.
+        if self.channel is None:
+            embed = discord.Embed(title="❌ Channel Not Found", description=self._not_found_message, color=0xff0000)
+            embed.set_thumbnail(url=AVATAR_URL)
+            return embed
+
+        permissions_message = "\n".join(
+            f"{'✅' if getattr(self.permission_details, perm, False) else '❌'} {perm.replace('_', ' ').title()}"
+            for perm in REQUIRED_PERMISSIONS
+        )
+
+        msg_d = "I don't have all the required permission to send messages to the selected channel."
+        msg_f = "I need at least the following permissions to work correctly"
+        msg_e_t = "To change channel permissions:"
+        msg_e_d = "Click on the 3 dots next to the channel name / Edit channel / Permissions"
+        msg_g = "Please update channel permissions and try again"
+        embed = discord.Embed(title="🔒 Missing permissions 🔒", description=f"{msg_d}", color=0xff0000)
+        embed.add_field(name="​", value="", inline=False)
+        embed.add_field(name=msg_f, value=f"\n{permissions_message}\n", inline=False)
+        embed.add_field(name="​", value="", inline=False)
+        embed.add_field(name=msg_e_t, value=msg_e_d, inline=False)
+        embed.set_footer(text=msg_g)
+        embed.set_thumbnail(url=AVATAR_URL)
+        return embed
+
+    @cached_property
+    def text_message(self) -> str:
+        if self.channel is None:
+            return f"**❌ Channel Not Found**\n{self._not_found_message}\n"
+
+        text_message = f"**{self.embed.title}**\n{self.embed.description}\n"
+        for field in self.embed.fields:
+            text_message += f"**{field.name}** {field.value}\n"
+        return text_message
+
+    @property
+    def _not_found_message(self) -> str:
+        return (f"The selected channel does not exist, or {self.bot_mention} can't access it. "
+                "To fix this, update your settings using the `/settings` command with a valid channel, "
+                "and ensure the bot has access to it.")
+
+
+# MARK: PermissionCache
+class PermissionCache:
+    """
+    Per (guild, channel) cache of the bot's channel permissions.
+
+    Entries are invalidated by the channel, role and member gateway events. The ttl
+    is a safety net for changes that reach us without an event.
+    """
+    def __init__(self, ttl: float = 3600) -> None:
+        self.ttl = ttl
+        self._entries: dict[tuple[int, int], tuple[float, PermissionStatus]] = {}
+
+    def get(self, channel, bot_mention: str) -> PermissionStatus:
+        if channel is None:
+            return PermissionStatus(bot_mention, None)
+
+        key = (channel.guild.id, channel.id)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+
+        status = PermissionStatus(bot_mention, channel, channel.permissions_for(channel.guild.me))
+        self._entries[key] = (now, status)
+        return status
+
+    def invalidate_channel(self, guild_id: int, channel_id: int) -> None:
+        self._entries.pop((guild_id, channel_id), None)
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
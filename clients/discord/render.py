@@ -0,0 +1,54 @@
+import asyncio
+import discord
+from io import BytesIO
+from typing import Awaitable, Callable
+import clients.discord.messages as messages
+from .ui_elements import FooterButtons
+
+
+class RenderedNotification:
+    """
+    Notification of one store update, rendered once and shared by every guild of the fan-out.
+
+    Only the role mention is added per guild, the embed, default text and footer view
+    are built a single time.
+    """
+    def __init__(self, store, image_url: str | None = None, image: bytes | None = None) -> None:
+        self._message_to_show = getattr(messages, store.name, messages.default)
+        self.store = store
+        self.image_url = image_url
+        self.default_txt = f'{store.service_name} has new free games'
+        self.embed: discord.Embed = self._message_to_show(store, image_url)
+        self.view = FooterButtons()
+        self._image_bytes = image if not image_url else None
+        self._image_type = store.image_type.lower()
+        self._upload_lock = asyncio.Lock()
+
+    def content(self, role: str | None = None) -> str:
+        return self.default_txt + f' {role}' if role else self.default_txt
+
+    def file(self) -> discord.File | None:
+        """
+        Returns a new attachment of the store image, or None when the embed uses the CDN url.
+        """
+        if self._image_bytes is None:
+            return None
+        return discord.File(fp=BytesIO(self._image_bytes), filename=f'img.{self._image_type}')
+
+    async def send(self, send: Callable[..., Awaitable[discord.Message | None]], role: str | None = None, **kwargs) -> discord.Message | None:
+        """
+        Sends the notification with `send`, a channel or webhook send method.
+
+        Without a CDN url the first send attaches the image and the url of that attachment
+        is used for the rest of the fan-out, so the bytes are only uploaded once.
+        """
+        if self._image_bytes is not None:
+            async with self._upload_lock:
+                if self._image_bytes is not None:
+                    message = await send(self.content(role), embed=self.embed, view=self.view, file=self.file(), **kwargs)
+                    if message and message.attachments:
+                        self.image_url = message.attachments[0].url
+                        self.embed = self._message_to_show(self.store, self.image_url)
+                        self._image_bytes = None
+                    return message
+        return await send(self.content(role), embed=self.embed, view=self.view, **kwargs)
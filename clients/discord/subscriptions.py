@@ -0,0 +1,96 @@
+import asyncio
+from utils import environment
+
+logger = environment.logging.getLogger("bot.discord")
+
+
+def parse_notification_settings(value) -> set[str]:
+    """
+    Returns the set of store ids a guild is subscribed to.
+
+    `notification_settings` is stored as the store ids (single characters) joined
+    together, e.g. 1342, so every character is one store id.
+    """
+    if not value:
+        return set()
+    return set(str(value))
+
+
+class SubscriptionIndex:
+    """
+    In-memory inverted index of store id -> subscribed guilds.
+
+    Built once from the guild documents at `on_ready` and kept up to date by the
+    settings callbacks, so working out who to notify never touches MongoDB.
+    """
+
+    FIELDS = ('server', 'server_name', 'channel', 'role', 'notification_settings', 'skip_low_quality', 'webhook', 'failures', 'parked')
+
+    def __init__(self) -> None:
+        self._servers: dict[int, dict] = {}
+        self._by_store: dict[str, set[int]] = {}
+        self._built = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def __contains__(self, server_id) -> bool:
+        return server_id in self._servers
+
+    def build(self, documents) -> None:
+        """
+        Rebuilds the index from a list of guild documents.
+        """
+        self._servers.clear()
+        self._by_store.clear()
+        for document in documents:
+            server_id = document.get('server')
+            if server_id is None:
+                continue
+            self._servers[server_id] = {field: document.get(field) for field in self.FIELDS}
+            self._add_to_stores(server_id)
+        self._built.set()
+        logger.info("Subscription index built", extra={
+            '_servers': len(self._servers),
+            '_stores': {store_id: len(ids) for store_id, ids in self._by_store.items()}
+        })
+
+    async def wait_until_built(self) -> None:
+        await self._built.wait()
+
+    def upsert(self, server_id: int, **fields) -> None:
+        """
+        Creates or updates the indexed record of a guild with the given fields.
+        """
+        record = self._servers.setdefault(server_id, {field: None for field in self.FIELDS})
+        record['server'] = server_id
+        record.update({key: value for key, value in fields.items() if key in self.FIELDS})
+
+        if 'notification_settings' in fields:
+            self._remove_from_stores(server_id)
+            self._add_to_stores(server_id)
+
+    def remove(self, server_id: int) -> None:
+        """
+        Drops a guild from the index, e.g. when the bot is removed from it.
+        """
+        if server_id in self._servers:
+            self._remove_from_stores(server_id)
+            del self._servers[server_id]
+
+    def get(self, server_id: int) -> dict | None:
+        return self._servers.get(server_id)
+
+    def subscribers(self, store_id: str) -> list[dict]:
+        """
+        Returns the records of every guild subscribed to the given store.
+        """
+        return [self._servers[server_id] for server_id in self._by_store.get(store_id, ())]
+
+    def _add_to_stores(self, server_id: int) -> None:
+        for store_id in parse_notification_settings(self._servers[server_id].get('notification_settings')):
+            self._by_store.setdefault(store_id, set()).add(server_id)
+
+    def _remove_from_stores(self, server_id: int) -> None:
+        for server_ids in self._by_store.values():
+            server_ids.discard(server_id)
@@ -44,7 +44,7 @@ class BackButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction) -> None:
         await self.settings_message.edit(
             content=None,
-            embed=settings_embed(self.client, interaction),
+            embed=await settings_embed(self.client, interaction),
             view=Settings_buttons(self.client, settings_message=self.settings_message)
         )
         if not interaction.response.is_done():
@@ -78,7 +78,7 @@ class FeedbackModal(discord.ui.Modal, title='Feedback'):
         'timestamp': datetime.now(),
         'feedback': str(self.feedback.value)
         }
-        Database.add_feedback(feedback_payload)
+        await asyncio.to_thread(Database.add_feedback, feedback_payload)
 
         if interaction.client.ADMIN_USER:
             await interaction.client.ADMIN_USER.send(f"**Feedback**\n`{feedback_payload['feedback']}`")
@@ -199,7 +199,7 @@ class Settings_buttons(discord.ui.View):
 
     # MARK: test settings
     async def test_settings_callback(self, interaction: discord.Interaction) -> None:
-        server = Database.get_discord_server(interaction.guild_id)
+        server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
         if server and server.get('channel'):
             channel = self.client.get_channel(server['channel'])
             embed = discord.Embed(title="⚙️ Test notification ⚙️", description=f"Notifications for games will be send to this channel", color=0x00aff4)
@@ -207,7 +207,7 @@ class Settings_buttons(discord.ui.View):
             # has_permissions, permissions_message = client.check_channel_permissions(channel)
             permissions = self.client.check_channel_permissions(channel)
 
-            if permissions['has_all_permissions']:
+            if permissions.has_all_permissions:
                 if server.get("role") and (server.get("role") == interaction.guild.default_role.id):
                     await channel.send(f'Pinging role @everyone for test', embed=embed)
                 elif server.get("role"):
@@ -218,19 +218,19 @@ class Settings_buttons(discord.ui.View):
             else:
                 if not interaction.response.is_done():
                     await interaction.response.defer()
-                await self.settings_message.edit(embed=permissions['embed'], view=Settings_buttons(self.client, self.settings_message))
+                await self.settings_message.edit(embed=permissions.embed, view=Settings_buttons(self.client, self.settings_message))
         else:
             await interaction.response.send_message("You have to set a channel first in order to test the notification", ephemeral=True)
 
 
     # MARK: Post all games
     async def post_all_games(self, interaction: discord.Interaction) -> None:
-        server = Database.get_discord_server(interaction.guild_id)
+        server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
         if server and server.get('channel'):
             channel = self.client.get_channel(server['channel'])
             permissions = self.client.check_channel_permissions(channel)
 
-            if permissions['has_all_permissions']:
+            if permissions.has_all_permissions:
                 if not interaction.response.is_done():
                     await interaction.response.defer(ephemeral=True)
 
@@ -240,7 +240,7 @@ class Settings_buttons(discord.ui.View):
                 msg_send = False
                 for store in self.client.modules:
                     if store.id in notifications_str:
-                        payload = build_deal_payload(store, mobile=False)
+                        payload = await build_deal_payload(store, mobile=False)
                         if payload:
                             msg_send = True
                             await channel.send(embed=payload["embed"], file=payload["file"])
@@ -249,13 +249,13 @@ class Settings_buttons(discord.ui.View):
 
                 await self.settings_message.edit(
                     content=None,
-                    embed=settings_embed(self.client, interaction, change_note="Selected store deals posted!"),
+                    embed=await settings_embed(self.client, interaction, change_note="Selected store deals posted!"),
                     view=Settings_buttons(self.client, settings_message=self.settings_message)
                 )
             else:
                 if not interaction.response.is_done():
                     await interaction.response.defer()
-                await self.settings_message.edit(embed=permissions['embed'], view=Settings_buttons(self.client, self.settings_message))
+                await self.settings_message.edit(embed=permissions.embed, view=Settings_buttons(self.client, self.settings_message))
         else:
             await interaction.response.send_message("You have to set a channel first in order to test the notification", ephemeral=True)
 
@@ -266,8 +266,9 @@ class Channel_Select(discord.ui.ChannelSelect):
     async def handle(interaction: discord.Interaction, client, settings_message) -> None:
         await interaction.response.defer()
         
-        if Database.get_discord_server(interaction.guild_id):
-            channel_id = Database.get_discord_server(interaction.guild_id).get('channel', None)  
+        server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
+        if server:
+            channel_id = server.get('channel', None)
 
         description_embed = discord.Embed( title="Channel selection Settings",
             description=(
@@ -297,13 +298,13 @@ class Channel_Select(discord.ui.ChannelSelect):
         selected_channel = interaction.guild.get_channel(self.values[0].id)
         permissions = self.client.check_channel_permissions(selected_channel)
 
-        if not permissions['has_all_permissions']:
+        if not permissions.has_all_permissions:
             view = discord.ui.View()
             view.add_item(Channel_Select(self.client, settings_message=self.settings_message))
             view.add_item(BackButton(self.client, self.settings_message))
 
             await interaction.response.edit_message(
-                embed=permissions['embed'],
+                embed=permissions.embed,
                 view=view
             )
             return
@@ -311,10 +312,19 @@ class Channel_Select(discord.ui.ChannelSelect):
         if not interaction.response.is_done():
             await interaction.response.defer()
 
-        Database.insert_discord_server([{
+        server = self.client.subscriptions.get(interaction.guild.id) or {}
+        webhook_url = server.get('webhook')
+        if selected_channel.id != server.get('channel') or not webhook_url:
+            await self.client.delete_notification_webhook(webhook_url)
+            webhook_url = await self.client.create_notification_webhook(selected_channel)
+
+        await asyncio.to_thread(Database.insert_discord_server, [{
             'server': interaction.guild.id,
-            'channel': selected_channel.id
+            'channel': selected_channel.id,
+            'webhook': webhook_url
         }])
+        self.client.subscriptions.upsert(interaction.guild.id, channel=selected_channel.id, webhook=webhook_url)
+        await self.client.unpark(interaction.guild.id)
 
         embed = settings_success(message=f"Channel set to: <#{str(selected_channel.id)}>")
         await self.settings_message.edit(content=None, embed=embed, view=None)
@@ -322,7 +332,7 @@ class Channel_Select(discord.ui.ChannelSelect):
 
         await self.settings_message.edit(
             content=None,
-            embed=settings_embed(self.client, interaction, change_note="Channel updated!"),
+            embed=await settings_embed(self.client, interaction, change_note="Channel updated!"),
             view=Settings_buttons(self.client, settings_message=self.settings_message)
         )
 
@@ -333,8 +343,9 @@ class Role_Select(discord.ui.Select):
     async def handle(interaction: discord.Interaction, client, settings_message) -> None:
         await interaction.response.defer()
         role_id = None
-        if Database.get_discord_server(interaction.guild_id):
-            role_id = Database.get_discord_server(interaction.guild_id).get('role')
+        server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
+        if server:
+            role_id = server.get('role')
         default_role = role_id if role_id is not None else None
 
         description_embed = discord.Embed( title="Role Notification Settings",
@@ -397,10 +408,12 @@ class Role_Select(discord.ui.Select):
         elif role:
             role_msg = f'<@&{role}>'
 
-        Database.insert_discord_server([{
+        await asyncio.to_thread(Database.insert_discord_server, [{
             'server': interaction.guild_id,
             'role': role
         }])
+        self.client.subscriptions.upsert(interaction.guild_id, role=role)
+        await self.client.unpark(interaction.guild_id)
 
         embed = settings_success(message=f"Role set to: {role_msg}")
         await self.settings_message.edit(content=None, embed=embed, view=None)
@@ -408,7 +421,7 @@ class Role_Select(discord.ui.Select):
 
         await self.settings_message.edit(
             content=None,
-            embed=settings_embed(self.client, interaction, change_note="Role updated !"),
+            embed=await settings_embed(self.client, interaction, change_note="Role updated !"),
             view=Settings_buttons(self.client, settings_message=self.settings_message)
         )
 
@@ -418,7 +431,7 @@ class Store_Select(discord.ui.Select):
     @staticmethod
     async def handle(interaction: discord.Interaction, client, settings_message) -> None:
         await interaction.response.defer()
-        server = Database.get_discord_server(interaction.guild_id)
+        server = await asyncio.to_thread(Database.get_discord_server, interaction.guild_id)
 
         description_embed = discord.Embed( title="Store notification Settings",
             description=(
@@ -426,13 +439,12 @@ class Store_Select(discord.ui.Select):
             ), color=0x00aff4
         )
         view = discord.ui.View()
-        view.add_item(Store_Select(client, interaction, settings_message))
+        view.add_item(Store_Select(client, server, settings_message))
         view.add_item(BackButton(client, settings_message))
         view.add_item(LowQualityToggleButton(server))
         await settings_message.edit(content=None, embed=description_embed, view=view)
 
-    def __init__(self, client, interaction, settings_message) -> None:
-        server = Database.get_discord_server(interaction.guild_id)
+    def __init__(self, client, server, settings_message) -> None:
         notifications_str = str(server['notification_settings'] if server and server.get('notification_settings') else '')
 
         options = []
@@ -468,10 +480,12 @@ class Store_Select(discord.ui.Select):
         else:
             notification_settings = None     
 
-        Database.insert_store_notifications([{
+        await asyncio.to_thread(Database.insert_store_notifications, [{
             'server' : interaction.guild_id,
             'notification_settings' : notification_settings
         }])
+        self.client.subscriptions.upsert(interaction.guild_id, notification_settings=notification_settings)
+        await self.client.unpark(interaction.guild_id)
 
         embed = settings_success()
         await self.settings_message.edit(content=None, embed=embed, view=None)
@@ -479,7 +493,7 @@ class Store_Select(discord.ui.Select):
         await asyncio.sleep(1)
         await self.settings_message.edit(
             content=None,
-            embed=settings_embed(self.client, interaction, change_note="Stores updated!"),
+            embed=await settings_embed(self.client, interaction, change_note="Stores updated!"),
             view=Settings_buttons(self.client, settings_message=self.settings_message)
         )
 
@@ -498,10 +512,12 @@ class LowQualityToggleButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction):
         self.skip_low_quality = not self.skip_low_quality
 
-        Database.insert_store_notifications([{
+        await asyncio.to_thread(Database.insert_store_notifications, [{
             'server' : interaction.guild_id,
             'skip_low_quality' : self.skip_low_quality
         }])
+        interaction.client.subscriptions.upsert(interaction.guild_id, skip_low_quality=self.skip_low_quality)
+        await interaction.client.unpark(interaction.guild_id)
 
         self.label = f"Skip low quality games: {'ON' if self.skip_low_quality else 'OFF'}"
         self.style = (
@@ -7,21 +7,27 @@ import importlib
 import psutil, tracemalloc, gc, ctypes
 
 from utils.database import Database
-from utils import environment
-
-import clients.discord.bot as discord_module
-import clients.twitter.bot as twitter
-import clients.blueSky.bot as blueSky
+from utils import environment, metrics
+from utils.loop_monitor import LoopMonitor
+from stores import _http, _renderer
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from stores._store import Store
+    import clients.discord.bot as discord_module
+    import clients.twitter.bot as twitter
+    import clients.blueSky.bot as blueSky
 
 logger = environment.logging.getLogger("bot.main")
 shutdown_flag_is_set: bool = False
 modules = []
 
+# Created by setup()
+discord: "discord_module.MyClient"
+x: "twitter.MyClient"
+bsky: "blueSky.MyClient"
+
 #MARK: load modules
 def load_modules() -> list:
     """Imports and instances all the modules automagically."""
@@ -41,13 +47,27 @@ def load_modules() -> list:
         sys.exit(1)
     return modules
 
-load_modules()
 
-discord = discord_module.MyClient(modules)
-Database.initialize(modules)
-Database.connect(environment.DB)
-x = twitter.MyClient()
-bsky = blueSky.MyClient()
+#MARK: setup
+def setup() -> None:
+    '''
+    Loads the stores, creates the clients and connects to the database.
+
+    Only called when main.py runs as a script: the renderer workers import this
+    module as __mp_main__ and must not start any of it.
+    '''
+    global discord, x, bsky
+    import clients.discord.bot as discord_module
+    import clients.twitter.bot as twitter
+    import clients.blueSky.bot as blueSky
+
+    load_modules()
+
+    discord = discord_module.MyClient(modules)
+    Database.initialize(modules)
+    Database.connect(environment.DB)
+    x = twitter.MyClient()
+    bsky = blueSky.MyClient()
 
 
 # MARK: Memory logger
@@ -71,48 +91,109 @@ async def update(update_store: "Store") -> None:
             logger.info("Updating store: %s", update_store.name)
             if await update_store.get():
                 update_store.image_cdn = await discord.upload_image_to_cdn(update_store)
-                Database.overwrite_deals(update_store.name, update_store.data)
-                Database.add_image(update_store)
+                await asyncio.to_thread(save_store, update_store)
                 await send_games_notification(update_store)
             else:
                 logger.debug("No new games to for %s", update_store.name)
 
+            update_store.commit_validators()
             update_store.reset_scheduler()
     
         except Exception:
             logger.error("Failed to update store: %s", update_store.name)
             update_store.schedule_retry()
-        
-        finally:
-            await update_store.close_session()
+
 
 #MARK: Initialize
 async def initialize() -> None:
     '''
     --- APP START / RESTART ---
     '''
+    # Updates published before this cluster first started were sent by another process
+    await asyncio.to_thread(Database.seed_handled_updates)
 
+    saved_stores = await asyncio.to_thread(Database.saved_stores)
     for store in modules:
         # If there's data for this store on the db get it
-        if store.name in Database.saved_stores():
+        if store.name in saved_stores:
             logger.debug("Getting Data from DB for %s", store.name)
-            store.data = Database.find(store.name)
-            store.image = Database.get_image(store.name)
-            store.image_cdn = Database.get_image(store.name, 'cdn')
+            await asyncio.to_thread(load_store, store)
             await store.create_checkout_url()
 
+            # Finish a fan-out that was interrupted by a restart
+            await discord.send_notifications(store, resume=True)
+
+            # Only the cluster leader scrapes, the other processes follow its updates
+            if not environment.CLUSTER_LEADER:
+                continue
+
             # Then check if live data is different
             logger.debug("Checking if theres new data")
             await update(store)
-        else:
+        elif environment.CLUSTER_LEADER:
             logger.debug("Scrapping data for %s", store.name)
             try:
                 await store.get()
-                Database.overwrite_deals(store.name, store.data)
-                Database.add_image(store)
+                await asyncio.to_thread(save_store, store)
+                # The first scrape of a store isn't notified
+                await asyncio.to_thread(Database.mark_update_handled, store.name, store.deal_hash())
+                store.commit_validators()
             except Exception as error:
                 logger.error("Failed to scrape store %s: %s", store.name, str(error))
 
+
+def save_store(store: "Store") -> None:
+    '''
+    Save the deals and image of a store and publish the update to the other cluster processes
+    '''
+    Database.mark_fanout_owed(store.name, store.deal_hash())
+    Database.overwrite_deals(store.name, store.data)
+    Database.add_image(store)
+    Database.publish_store_update(store.name, store.deal_hash())
+
+
+def load_store(store: "Store") -> None:
+    '''
+    Load the deals and image of a store saved on the db
+    '''
+    store.data = Database.find(store.name)
+    store.image = Database.get_image(store.name)
+    store.image_cdn = Database.get_image(store.name, 'cdn')
+
+
+#MARK: Follow updates
+async def follow_updates() -> None:
+    '''
+    Cluster followers don't scrape, they poll the updates published by the
+    leader and fan out the notifications to the guilds on their own shards.
+    '''
+    await initialize()
+
+    while not shutdown_flag_is_set:
+        try:
+            published = await asyncio.to_thread(Database.get_store_updates)
+        except Exception:
+            logger.error("Failed to read published store updates")
+            published = {}
+
+        for store in modules:
+            store_update = published.get(store.name, {})
+            deal_hash = store_update.get('deal_hash')
+            if not deal_hash or deal_hash == store_update.get('handled', {}).get(str(environment.CLUSTER_ID)):
+                continue
+
+            logger.info("Following update for %s", store.name)
+            try:
+                await asyncio.to_thread(load_store, store)
+                await store.create_checkout_url()
+                # Marked handled once its outbox jobs exist, an interrupted fan-out is finished on restart
+                await discord.send_notifications(store)
+            except Exception:
+                logger.error("Failed to follow update for %s", store.name)
+
+        await asyncio.sleep(environment.CLUSTER_POLL_INTERVAL)
+
+
 #MARK: Send games notification
 async def send_games_notification(store) -> None:
     '''
@@ -122,15 +203,17 @@ async def send_games_notification(store) -> None:
 
     # tweet about it...
     if store.twitter_notification and x:
-        tweet_url = x.tweet(store)
+        await store.media('twitter')
+        tweet_url = await asyncio.to_thread(x.tweet, store)
         await discord.dm_logs("Tweet", tweet_url)
-        Database.update_social_followers(x.get_follower_count())
+        await asyncio.to_thread(lambda: Database.update_social_followers(x.get_follower_count()))
 
     # The other tweet about it...
     if store.bsky_notification and bsky:
-        bsky_url = bsky.post(store)
+        await store.media('video')
+        bsky_url = await asyncio.to_thread(bsky.post, store)
         await discord.dm_logs("Bluesky", bsky_url)
-        Database.update_social_followers(bsky.get_follower_count())
+        await asyncio.to_thread(lambda: Database.update_social_followers(bsky.get_follower_count()))
 
     log_memory('Before send discord notification')
     await discord.send_notifications(store)
@@ -183,6 +266,7 @@ async def scrape_scheduler() -> None:
 
 #MARK: main
 if __name__ == "__main__":
+    setup()
     log_memory('Start')
 
     if environment.DISCORD_BOT_TOKEN is None:
@@ -196,9 +280,19 @@ if __name__ == "__main__":
 
         asyncio.set_event_loop(loop)
 
+        if environment.METRICS_PORT:
+            loop.create_task(metrics.serve(environment.METRICS_PORT))
+
+        if environment.LOOP_MONITOR_THRESHOLD > 0:
+            LoopMonitor(environment.LOOP_MONITOR_THRESHOLD).start(loop)
+
         loop.create_task(discord.start(environment.DISCORD_BOT_TOKEN))
-        loop.create_task(initialize())
-        loop.create_task(scrape_scheduler())
+        if environment.CLUSTER_LEADER:
+            loop.create_task(initialize())
+            loop.create_task(scrape_scheduler())
+        else:
+            logger.info("Cluster follower %s, stores are scraped by the leader", environment.CLUSTER_ID)
+            loop.create_task(follow_updates())
         loop.run_forever()
 
     except KeyboardInterrupt as exit:
@@ -207,4 +301,6 @@ if __name__ == "__main__":
 
     finally:
         logger.info("Exiting program.")
+        _renderer.shutdown()
+        loop.run_until_complete(_http.close())
         loop.close()
@@ -0,0 +1,42 @@
+import aiohttp
+from utils import environment
+
+_connector: aiohttp.TCPConnector | None = None
+
+
+def get_connector() -> aiohttp.TCPConnector:
+    """
+    Returns the connection pool shared by every store session.
+
+    Connections are kept alive between polls and DNS lookups are cached, so a store
+    update only pays for the TCP and TLS handshakes the first time it reaches a host.
+    Sessions don't own the connector, closing one keeps the pool open.
+    """
+    global _connector
+    if _connector is None or _connector.closed:
+        _connector = aiohttp.TCPConnector(
+            limit=environment.HTTP_POOL_SIZE,
+            limit_per_host=environment.HTTP_POOL_PER_HOST,
+            ttl_dns_cache=environment.HTTP_DNS_TTL,
+            keepalive_timeout=environment.HTTP_KEEPALIVE
+        )
+    return _connector
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Creates a session on the shared pool with its own cookie jar.
+    """
+    return aiohttp.ClientSession(
+        connector=get_connector(),
+        connector_owner=False,
+        cookie_jar=aiohttp.CookieJar(),
+        timeout=aiohttp.ClientTimeout(total=20)
+    )
+
+
+async def close() -> None:
+    global _connector
+    if _connector is not None and not _connector.closed:
+        await _connector.close()
+    _connector = None
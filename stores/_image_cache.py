@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from PIL import Image
+from utils import environment
+
+logger = environment.logging.getLogger("store.image_cache")
+
+
+class ImageCache:
+    """
+    Bounded on-disk LRU cache for store artwork.
+
+    Downloaded bytes are stored once per content hash (`blobs/`), each URL has a small
+    metadata file with its ETag / Last-Modified and the hash of its content (`meta/`),
+    and decoded images are kept per target height (`variants/`) as raw pixels so a
+    cache hit skips the download, the resize and any decode or encode.
+
+    Files are touched on every hit and the least recently used ones are removed once
+    the cache grows past `max_bytes`, metadata files included. A removed blob takes
+    its variants and metadata with it. All disk access runs in a thread.
+    """
+    def __init__(self, directory: str, max_bytes: int, max_age: float) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._size: int | None = None
+        self._lock = asyncio.Lock()
+
+    # MARK: paths
+    def _path(self, kind: str, name: str) -> str:
+        return os.path.join(self.directory, kind, name)
+
+    def _meta_path(self, url: str) -> str:
+        return self._path('meta', hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+    def _blob_path(self, sha: str) -> str:
+        return self._path('blobs', sha)
+
+    def _variant_path(self, sha: str, height: int) -> str:
+        return self._path('variants', f'{sha}-{height}.raw')
+
+    # MARK: metadata
+    def _read_meta(self, url: str) -> dict | None:
+        try:
+            with open(self._meta_path(url)) as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(meta.get('sha', ''))):
+            return None
+        os.utime(self._meta_path(url))
+        return meta
+
+    async def lookup(self, url: str) -> dict | None:
+        """
+        Returns the cached metadata of a url, or None if the url isn't cached.
+        """
+        return await asyncio.to_thread(self._read_meta, url)
+
+    def is_fresh(self, meta: dict) -> bool:
+        """
+        True if the entry was validated recently enough to skip the request altogether.
+        """
+        return time.time() - meta.get('validated', 0) < self.max_age
+
+    @staticmethod
+    def validators(meta: dict | None) -> dict:
+        """
+        Conditional request headers for a cached entry.
+        """
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def _write_meta(self, url: str, meta: dict) -> int:
+        """
+        Returns the bytes the metadata file added to the cache.
+        """
+        path = self._meta_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path + '.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(path + '.tmp', path)
+        return os.path.getsize(path) - previous
+
+    async def revalidated(self, url: str, meta: dict) -> None:
+        """
+        Marks an entry as fresh again after a 304 response.
+        """
+        meta['validated'] = time.time()
+        await asyncio.to_thread(self._write_meta, url, meta)
+
+    # MARK: blobs
+    def _write_blob(self, url: str, data: bytes, etag: str | None, last_modified: str | None) -> tuple[str, int]:
+        sha = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(sha)
+        added = 0
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            with open(blob_path + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(blob_path + '.tmp', blob_path)
+            added = len(data)
+        added += self._write_meta(url, {
+            'url': url,
+            'sha': sha,
+            'etag': etag,
+            'last_modified': last_modified,
+            'validated': time.time()
+        })
+        return sha, added
+
+    async def store(self, url: str, data: bytes, etag: str | None = None, last_modified: str | None = None) -> str:
+        """
+        Saves downloaded image bytes and returns their content hash.
+        """
+        sha, added = await asyncio.to_thread(self._write_blob, url, data, etag, last_modified)
+        await self._added(added)
+        return sha
+
+    def _read_blob(self, sha: str) -> bytes | None:
+        try:
+            with open(self._blob_path(sha), 'rb') as file:
+                data = file.read()
+            os.utime(self._blob_path(sha))
+            return data
+        except OSError:
+            return None
+
+    async def load(self, sha: str) -> bytes | None:
+        return await asyncio.to_thread(self._read_blob, sha)
+
+    # MARK: variants
+    def _read_variant(self, sha: str, height: int) -> Image.Image | None:
+        path = self._variant_path(sha, height)
+        try:
+            with open(path, 'rb') as file:
+                mode, width, frame_height = file.readline().decode().split()
+                variant = Image.frombytes(mode, (int(width), int(frame_height)), file.read())
+            os.utime(path)
+            os.utime(self._blob_path(sha))
+            return variant
+        except (OSError, ValueError):
+            return None
+
+    async def load_variant(self, sha: str, height: int) -> Image.Image | None:
+        """
+        Returns the decoded image resized to `height`, if it's cached.
+        """
+        return await asyncio.to_thread(self._read_variant, sha, height)
+
+    def _write_variant(self, sha: str, height: int, image: Image.Image) -> int:
+        path = self._variant_path(sha, height)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(f'{image.mode} {image.width} {image.height}\n'.encode())
+            file.write(image.tobytes())
+        os.replace(path + '.tmp', path)
+        return os.path.getsize(path)
+
+    async def save_variant(self, sha: str, height: int, image: Image.Image) -> None:
+        try:
+            added = await asyncio.to_thread(self._write_variant, sha, height, image)
+        except OSError as e:
+            logger.warning("Failed to cache image variant: %s", e)
+            return
+        await self._added(added)
+
+    # MARK: eviction
+    def _files(self) -> list[tuple[float, int, str]]:
+        files = []
+        for kind in ('blobs', 'variants', 'meta'):
+            directory = self._path(kind, '')
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self) -> int:
+        files = sorted(self._files())
+        size = sum(file_size for _, file_size, _ in files)
+        # Evict down to 90% so we don't scan the cache on every write once it's full
+        target = self.max_bytes * 0.9
+        removed_blobs: set[str] = set()
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            if not os.path.exists(path):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            if os.path.dirname(path) == os.path.dirname(self._blob_path('')):
+                removed_blobs.add(os.path.basename(path))
+                size -= self._remove_variants(os.path.basename(path))
+
+        if removed_blobs:
+            size -= self._remove_orphan_meta()
+            logger.debug("Evicted %s cached images", len(removed_blobs), extra={'_cache_size': size})
+        return size
+
+    def _remove_variants(self, sha: str) -> int:
+        removed = 0
+        directory = self._path('variants', '')
+        if not os.path.isdir(directory):
+            return 0
+        for entry in os.scandir(directory):
+            if entry.name.startswith(f'{sha}-'):
+                try:
+                    file_size = entry.stat().st_size
+                    os.remove(entry.path)
+                    removed += file_size
+                except OSError:
+                    continue
+        return removed
+
+    def _remove_orphan_meta(self) -> int:
+        """
+        Removes the metadata of urls whose blob is gone, returns the bytes freed.
+        """
+        removed = 0
+        directory = self._path('meta', '')
+        if not os.path.isdir(directory):
+            return 0
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                with open(entry.path) as file:
+                    sha = json.load(file).get('sha', '')
+            except (OSError, ValueError):
+                sha = ''
+            if not os.path.exists(self._blob_path(sha)):
+                try:
+                    file_size = entry.stat().st_size
+                    os.remove(entry.path)
+                    removed += file_size
+                except OSError:
+                    continue
+        return removed
+
+    async def _added(self, added: int) -> None:
+        async with self._lock:
+            if self._size is None:
+                self._size = sum(file_size for _, file_size, _ in await asyncio.to_thread(self._files))
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._size = await asyncio.to_thread(self._evict)
+
+
+image_cache = ImageCache(
+    environment.IMAGE_CACHE_DIR,
+    environment.IMAGE_CACHE_SIZE_MB * 1024 * 1024,
+    environment.IMAGE_CACHE_MAX_AGE
+)
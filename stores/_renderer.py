@@ -0,0 +1,335 @@
+import asyncio
+import io
+import multiprocessing
+import time
+import imageio
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, TypeVar
+from PIL import Image
+from utils import environment
+
+logger = environment.logging.getLogger("store.renderer")
+
+T = TypeVar('T')
+
+# (width, height, offset) of each frame in the shared memory block, per frame group
+Layout = list[list[tuple[int, int, int]]]
+
+_pool: ProcessPoolExecutor | None = None
+
+FRAME_SECONDS = 3
+# Frames encoded to estimate the size of a GIF with a palette per frame
+BASELINE_SAMPLE_FRAMES = 2
+VIDEO_FPS = 5
+BACKGROUND = (47, 49, 54)
+
+
+# MARK: jobs
+def encode_animation(frames: list[Image.Image], size: int = 1, video: bool = False) -> tuple[bytes, dict]:
+    """
+    Encodes the frames as a GIF, or as an MP4 when `video` is set.
+    Returns the media and the GIF stats, which are empty for a video.
+
+    Frames are expected at their final height, smaller ones are centered on a
+    background the size of the largest one so no artwork is cut. Only `size` > 1
+    resamples them again.
+    """
+    if not frames:
+        return b'', {}
+
+    if size > 1:
+        frames = [
+            img.resize((max(1, img.width // size), max(1, img.height // size)), Image.Resampling.LANCZOS)
+            for img in frames
+        ]
+    # Even dimensions for yuv420p
+    target_width = (max(img.width for img in frames) + 1) // 2 * 2
+    target_height = (max(img.height for img in frames) + 1) // 2 * 2
+    fitted_imgs = [_fit(img, target_width, target_height) for img in frames]
+
+    if video:
+        return encode_mp4(fitted_imgs), {}
+    return encode_gif(fitted_imgs)
+
+
+def _fit(img: Image.Image, width: int, height: int) -> Image.Image:
+    if img.size == (width, height):
+        return img
+    frame = Image.new('RGB', (width, height), BACKGROUND)
+    frame.paste(img, ((width - img.width) // 2, (height - img.height) // 2))
+    return frame
+
+
+def encode_mp4(frames: list[Image.Image]) -> bytes:
+    """
+    Encodes the frames as an MP4 that shows each frame for FRAME_SECONDS.
+    """
+    mp4 = io.BytesIO()
+    # Each image is sent to ffmpeg once as a FRAME_SECONDS long frame, ffmpeg repeats it to get VIDEO_FPS
+    writer = imageio.get_writer(mp4, fps=1 / FRAME_SECONDS, format='mp4', macro_block_size=2, output_params=['-r', str(VIDEO_FPS)]) # type: ignore
+    for img in frames:
+        writer.append_data(np.asarray(img))
+    writer.close()
+    return mp4.getvalue()
+
+
+def compose_epic(current: list[Image.Image], upcoming: list[Image.Image], height: int | None = None) -> tuple[bytes, dict]:
+    """
+    Pairs current and upcoming Epic games side by side and encodes the pairs as a GIF.
+    The shorter list repeats its last image, images are scaled to `height` first.
+    """
+    if height:
+        current, upcoming = (
+            [img if img.height == height else img.resize((max(1, round(img.width * height / img.height)), height), Image.Resampling.LANCZOS) for img in images]
+            for images in (current, upcoming)
+        )
+
+    def arrange(images: list[Image.Image]) -> list[Image.Image]:
+        palette = images[0].getpalette()
+        pixels = [np.asarray(img) for img in images]
+        current_pixels, upcoming_pixels = pixels[:len(current)], pixels[len(current):]
+        frame_count = max(len(current_pixels), len(upcoming_pixels))
+        frames = []
+        for index in range(frame_count):
+            left = current_pixels[min(index, len(current_pixels) - 1)]
+            right = upcoming_pixels[min(index, len(upcoming_pixels) - 1)]
+            frame_height = left.shape[0] if len(current_pixels) >= len(upcoming_pixels) else right.shape[0]
+            frame = np.zeros((frame_height, left.shape[1] + right.shape[1], *left.shape[2:]), dtype=np.uint8)
+            frame[:min(frame_height, left.shape[0]), :left.shape[1]] = left[:frame_height]
+            frame[:min(frame_height, right.shape[0]), left.shape[1]:] = right[:frame_height]
+            frame_image = Image.fromarray(frame, images[0].mode)
+            if palette:
+                frame_image.putpalette(palette)
+            frames.append(frame_image)
+        return frames
+
+    return encode_gif(current + upcoming, arrange)
+
+
+# MARK: GIF
+def _save_gif(frames: list[Image.Image], duration: int) -> bytes:
+    gif = io.BytesIO()
+    frames[0].save(gif, format='GIF', append_images=frames[1:], save_all=True, duration=duration, loop=0, optimize=False)
+    return gif.getvalue()
+
+
+def _estimate_baseline(frames: list[Image.Image], duration: int) -> int:
+    """
+    Estimates the size of a GIF that uses a palette per frame from a few evenly spaced frames.
+    """
+    step = max(1, len(frames) // BASELINE_SAMPLE_FRAMES)
+    sample = frames[::step][:BASELINE_SAMPLE_FRAMES]
+    return round(sum(len(_save_gif([frame], duration)) for frame in sample) * len(frames) / len(sample))
+
+
+def _quantize(images: list[Image.Image], colors: int) -> list[Image.Image]:
+    """
+    Maps all images to one palette built from a sample of every image.
+    """
+    thumbnails = []
+    for img in images:
+        thumbnail = img.copy()
+        thumbnail.thumbnail((128, 128))
+        thumbnails.append(thumbnail)
+    sample = Image.new('RGB', (sum(thumbnail.width for thumbnail in thumbnails), max(thumbnail.height for thumbnail in thumbnails)))
+    offset = 0
+    for thumbnail in thumbnails:
+        sample.paste(thumbnail, (offset, 0))
+        offset += thumbnail.width
+    palette = sample.quantize(colors, method=Image.Quantize.MEDIANCUT)
+    return [img.quantize(palette=palette, dither=Image.Dither.NONE) for img in images]
+
+
+def encode_gif(
+    images: list[Image.Image],
+    arrange: Callable[[list[Image.Image]], list[Image.Image]] | None = None,
+    duration: int = 2000
+) -> tuple[bytes, dict]:
+    """
+    Encodes a GIF with one global palette.
+
+    `arrange` builds the frames from the images, it runs after quantization so the
+    parts that repeat between frames keep the same palette indexes and Pillow only
+    writes the region that changed. If the GIF is over GIF_BYTE_BUDGET the palette
+    is reduced to 64 colors and then the images are scaled down, to half size at most.
+
+    Returns the GIF and its stats, `saved` is the difference with a GIF that uses a
+    palette per frame. That GIF is only encoded in full when the result is still over
+    the budget, and kept when it's the smaller one. Otherwise its size is estimated
+    from BASELINE_SAMPLE_FRAMES frames and `baseline_estimated` is set.
+    """
+    arrange = arrange or (lambda frames: frames)
+
+    colors, scale = 256, 1.0
+    while True:
+        scaled = images if scale == 1 else [
+            img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.Resampling.LANCZOS)
+            for img in images
+        ]
+        gif = _save_gif(arrange(_quantize(scaled, colors)), duration)
+        if len(gif) <= environment.GIF_BYTE_BUDGET or scale <= 0.5:
+            break
+        if colors > 64:
+            colors //= 2
+        else:
+            scale -= 0.25
+
+    baseline_frames = arrange(images)
+    baseline_estimated = len(gif) <= environment.GIF_BYTE_BUDGET
+    if baseline_estimated:
+        baseline_bytes = _estimate_baseline(baseline_frames, duration)
+    else:
+        # Frames that share nothing can come out smaller with a palette each
+        baseline = _save_gif(baseline_frames, duration)
+        baseline_bytes = len(baseline)
+        if len(baseline) < len(gif):
+            gif, colors, scale = baseline, 256, 1.0
+
+    return gif, {
+        'bytes': len(gif),
+        'baseline_bytes': baseline_bytes,
+        'baseline_estimated': baseline_estimated,
+        'saved': baseline_bytes - len(gif),
+        'colors': colors,
+        'scale': scale
+    }
+
+
+# MARK: shared memory
+def _pack(groups: list[list[Image.Image]]) -> tuple[SharedMemory, Layout]:
+    frames = [[img if img.mode == 'RGB' else img.convert('RGB') for img in group] for group in groups]
+    total = sum(img.width * img.height * 3 for group in frames for img in group)
+    shm = SharedMemory(create=True, size=max(total, 1))
+    layout: Layout = []
+    offset = 0
+    for group in frames:
+        group_layout = []
+        for img in group:
+            data = img.tobytes()
+            shm.buf[offset:offset + len(data)] = data
+            group_layout.append((img.width, img.height, offset))
+            offset += len(data)
+        layout.append(group_layout)
+    return shm, layout
+
+
+def _unpack(shm: SharedMemory, layout: Layout) -> list[list[Image.Image]]:
+    return [
+        [Image.frombytes('RGB', (width, height), bytes(shm.buf[offset:offset + width * height * 3])) for width, height, offset in group]
+        for group in layout
+    ]
+
+
+def _reset_peak_memory() -> None:
+    # Resets VmHWM so it holds the peak of the next job only (Linux)
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+def _peak_memory() -> int | None:
+    """
+    Peak resident memory of this process in bytes.
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _execute(job: Callable[..., T], shm_name: str, layout: Layout, args: tuple) -> tuple[T, int | None]:
+    _reset_peak_memory()
+    shm = SharedMemory(name=shm_name)
+    try:
+        groups = _unpack(shm, layout)
+    finally:
+        shm.close()
+    result = job(*groups, *args)
+    del groups
+    return result, _peak_memory()
+
+
+# MARK: pool
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['stores._renderer'])
+        _pool = ProcessPoolExecutor(max_workers=environment.RENDER_WORKERS, mp_context=context)
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def render(job: Callable[..., T], groups: list[list[Image.Image]], *args) -> T:
+    """
+    Runs a render job in the renderer process pool.
+
+    The frames of each group are copied once into a shared memory block and the job
+    receives them as lists of images, followed by `args`. Jobs return encoded bytes,
+    so rendering never holds the GIL of the bot process.
+    """
+    shm, layout = await asyncio.to_thread(_pack, groups)
+    try:
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        result, peak_memory = await loop.run_in_executor(get_pool(), _execute, job, shm.name, layout, args)
+        logger.info("Rendered %s in %.2fs", job.__name__, time.monotonic() - start_time, extra={
+            '_frames': sum(len(group) for group in layout),
+            '_frame_mb': round(shm.size / 1024 / 1024, 1),
+            '_peak_mb': round(peak_memory / 1024 / 1024, 1) if peak_memory else None
+        })
+        return result
+    except BrokenProcessPool:
+        logger.warning("Renderer pool crashed, rendering %s in a thread", job.__name__)
+        shutdown()
+        return await asyncio.to_thread(job, *groups, *args)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+# MARK: benchmark
+if __name__ == "__main__":
+    # run with python -m stores._renderer [games]
+    import sys
+    import tracemalloc
+
+    def encode_mp4_per_frame(frames: list[Image.Image]) -> bytes:
+        """
+        Previous MP4 encode, every image was appended FRAME_SECONDS * VIDEO_FPS times.
+        """
+        mp4 = io.BytesIO()
+        writer = imageio.get_writer(mp4, fps=VIDEO_FPS, format='mp4') # type: ignore
+        for img in frames:
+            for _ in range(FRAME_SECONDS * VIDEO_FPS):
+                writer.append_data(np.array(img))
+        writer.close()
+        return mp4.getvalue()
+
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    rng = np.random.default_rng(0)
+    frames = [Image.fromarray(rng.integers(0, 256, (496, 384, 3), dtype=np.uint8)) for _ in range(games)]
+
+    for name, encode in (('per frame', encode_mp4_per_frame), ('once', encode_mp4)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = len(encode(frames))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>10}: {elapsed:6.2f}s  peak {peak / 1024 / 1024:6.1f} MB  {size / 1024:8.1f} KB  ({games} games)")
@@ -1,19 +1,35 @@
 import asyncio
+import hashlib
 import io
 import imageio
 import aiohttp
 import json
 import numpy as np
 from lxml import html
-from urllib.request import urlopen
 from playwright.async_api import async_playwright
 from typing import List, IO, Self, overload, Literal
 from PIL import Image
 from utils import environment, database
+from stores._image_cache import image_cache
+from stores import _http, _renderer
 from datetime import datetime, timedelta
 import psutil, tracemalloc
 import objgraph
 import gc
+import re
+
+MediaVariant = Literal['discord', 'twitter', 'video']
+MEDIA_ATTRIBUTES = {'discord': 'image', 'twitter': 'image_twitter', 'video': 'video'}
+
+
+class NotModified:
+    """
+    Returned by a conditional `request_data` when the response is the same as the last processed one.
+    """
+    def __repr__(self) -> str:
+        return 'NOT_MODIFIED'
+
+NOT_MODIFIED = NotModified()
 
 class Store:
     """
@@ -58,6 +74,10 @@ class Store:
         self.bsky_notification = bsky_notification
         self.require_all_deals_new = require_all_deals_new
         self._session: aiohttp.ClientSession | None = None
+        self._media_futures: dict[str, asyncio.Future] = {}
+        # url -> {'etag', 'last_modified', 'hash'} of the last processed response
+        self._validators: dict[str, dict] = {}
+        self._pending_validators: dict[str, dict] = {}
 
     # MARK Scheduler timer change
     def schedule_retry(self) -> None:
@@ -89,7 +109,8 @@ class Store:
         method: str = 'GET',
         headers: dict | None = None,
         cookies: dict | None = None,
-        body: dict | None = None
+        body: dict | None = None,
+        conditional: bool = False
     ) -> dict | None: ...
 
 
@@ -100,7 +121,8 @@ class Store:
         method: str = 'GET',
         headers: dict | None = None,
         cookies: dict | None = None,
-        body: dict | None = None
+        body: dict | None = None,
+        conditional: bool = False
     ) -> str | None: ...
 
 
@@ -111,7 +133,8 @@ class Store:
         method: str = 'GET',
         headers: dict | None = None,
         cookies: dict | None = None,
-        body: dict | None = None
+        body: dict | None = None,
+        conditional: bool = False
     ) -> html.HtmlElement | None: ...
 
     async def request_data(
@@ -121,8 +144,9 @@ class Store:
         method: str = 'GET',
         headers: dict | None = None,
         cookies: dict | None = None,
-        body: dict | None = None
-    ) -> dict | str | html.HtmlElement | None:
+        body: dict | None = None,
+        conditional: bool = False
+    ) -> dict | str | html.HtmlElement | NotModified | None:
         """
         Make an HTTP request and return the response in the requested format.
 
@@ -143,13 +167,18 @@ class Store:
             Cookies to include in the request.
         body : dict, optional
             JSON body to send with the request (for POST/PUT).
+        conditional : bool, default False
+            Send the validators of the last processed response and return
+            `NOT_MODIFIED` on a 304 or when the normalised body hashes the same.
+            The new validators are only kept once `commit_validators` is called.
 
         Returns
         -------
-        dict | str | html.HtmlElement | None
+        dict | str | html.HtmlElement | NotModified | None
             - `dict` if mode='json'
             - `str` if mode='text'
             - `HtmlElement` if mode='html'
+            - `NOT_MODIFIED` if the request is conditional and nothing changed
             - `None` if the request fails or an exception occurs
         """
 
@@ -157,23 +186,63 @@ class Store:
         if headers:
             default_headers.update(headers)
 
+        validators = self._validators.get(url, {}) if conditional else {}
+        if validators.get('etag'):
+            default_headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            default_headers['If-Modified-Since'] = validators['last_modified']
+
         try:
             await self.create_session()
             assert self._session is not None
             async with self._session.request(method, url, headers=default_headers, json=body, cookies=cookies) as response:
+                if conditional and response.status == 304:
+                    self.logger.debug("Not modified: %s", url)
+                    return NOT_MODIFIED
                 response.raise_for_status()
+                raw = await response.read()
                 if mode == 'json':
-                    return await response.json(content_type=None)
+                    data = json.loads(raw)
                 elif mode == 'text':
-                    return await response.text()
+                    data = raw.decode(response.get_encoding())
                 elif mode == 'html':
-                    return html.fromstring(await response.read())
+                    data = None
                 else:
                     raise ValueError(f"Unsupported mode: {mode}")
+
+                if conditional:
+                    body_hash = self._body_hash(data if mode == 'json' else raw)
+                    self._pending_validators[url] = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'hash': body_hash
+                    }
+                    if body_hash == validators.get('hash'):
+                        self.logger.debug("Unchanged response: %s", url)
+                        return NOT_MODIFIED
+
+                return html.fromstring(raw) if mode == 'html' else data
         except:
             self.logger.warning("Request to %s failed", self.service_name)
             return None
 
+    @staticmethod
+    def _body_hash(body: dict | list | bytes) -> str:
+        # Key order and whitespace don't count as a change
+        if isinstance(body, bytes):
+            normalised = re.sub(rb'\s+', b' ', body).strip()
+        else:
+            normalised = json.dumps(body, sort_keys=True, separators=(',', ':')).encode()
+        return hashlib.sha256(normalised).hexdigest()
+
+    def commit_validators(self) -> None:
+        """
+        Keeps the validators of the responses requested since the last commit, call it once
+        they were processed so a failed update fetches and processes them again.
+        """
+        self._validators.update(self._pending_validators)
+        self._pending_validators.clear()
+
 
     async def close_session(self) -> None:
         if self._session and not self._session.closed:
@@ -186,8 +255,9 @@ class Store:
 
 
     async def create_session(self) -> None:
+        # Long-lived, the connections come from the pool in stores._http and the cookies stay per store
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
+            self._session = _http.create_session()
 
 
     #MARK: playwrite
@@ -247,6 +317,39 @@ class Store:
 
             await browser.close()
         return result
+
+    async def request_pages_playwright(self, urls: list[str]) -> dict[str, str | None]:
+        """
+        Loads every url in one Playwright Chromium session and returns the page
+        content by url, None for the pages that failed to load.
+        """
+        results: dict[str, str | None] = {}
+        if not urls:
+            return results
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=["--no-sandbox"])
+            try:
+                context = await browser.new_context(
+                    user_agent=(
+                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                        "AppleWebKit/537.36 (KHTML, like Gecko) "
+                        "Chrome/121.0.0.0 Safari/537.36"
+                    ),
+                    java_script_enabled=True
+                )
+                page = await context.new_page()
+                for url in urls:
+                    try:
+                        await page.goto(url)
+                        await page.wait_for_load_state('domcontentloaded')
+                        results[url] = await page.content()
+                    except Exception as e:
+                        self.logger.warning("Playwright request failed: %s", e)
+                        results[url] = None
+            finally:
+                await browser.close()
+        return results
     
 
     # Mark: json cleanup
@@ -263,18 +366,28 @@ class Store:
             return {}
 
 
-    def make_image(self)-> Image.Image | None:
+    async def make_image(self)-> Image.Image | None:
         '''
         Creates an image with game images appended side by side
         '''
+        if not self.data:
+            return None
+
+        async def load(url: str) -> bytes | None:
+            sha = await self._download_image(url, await image_cache.lookup(url))
+            return await image_cache.load(sha) if sha else None
+
+        image_data = await asyncio.gather(*(load(game['image']) for game in self.data))
+        return await asyncio.to_thread(self._combine_images, [data for data in image_data if data])
+
+    def _combine_images(self, image_data: list[bytes]) -> Image.Image | None:
         images = []
         new_img_size = 0
 
-        if self.data:
-            for game in self.data:
-                with urlopen(game['image']) as img_stream:
-                    with Image.open(img_stream) as img:
-                        images.append(img.copy())
+        if image_data:
+            for data in image_data:
+                with Image.open(io.BytesIO(data)) as img:
+                    images.append(img.copy())
 
             for image in images:
                 new_img_size += image.size[0]
@@ -312,30 +425,72 @@ class Store:
 
 
     async def fetch_image(self, url:str, max_height: int = 300) -> Image.Image | None:
-        """Fetch an image asynchronously and return a BytesIO object."""
+        """
+        Fetch an image resized to `max_height`, this is the only resample an image goes through.
+
+        Artwork goes through the on-disk image cache, recently validated entries are
+        used without a request, older ones are revalidated with ETag / Last-Modified.
+        """
         try:
-            await self.create_session()
-            assert self._session is not None
-            async with self._session.get(url) as response:
-                if response.status != 200:
+            meta = await image_cache.lookup(url)
+            sha = meta['sha'] if meta and image_cache.is_fresh(meta) else None
+
+            if sha is None:
+                sha = await self._download_image(url, meta)
+                if sha is None:
                     return None
-                image_data = await response.read()
 
-            buffer = io.BytesIO(image_data)
-            with Image.open(buffer) as img:
-                img = img.convert("RGB")
-                height_percent = (max_height / float(img.size[1]))
-                width_size = int((float(img.size[0]) * float(height_percent)))
-                img = img.resize((width_size, max_height), Image.Resampling.LANCZOS)
-                return img.copy()
+            img = await image_cache.load_variant(sha, max_height)
+            if img is not None:
+                return img
+
+            image_data = await image_cache.load(sha)
+            if image_data is None:
+                return None
+
+            with Image.open(io.BytesIO(image_data)) as source:
+                height_percent = (max_height / float(source.size[1]))
+                width_size = int((float(source.size[0]) * float(height_percent)))
+                # JPEGs are decoded at the smallest scale that's still larger than the target
+                source.draft('RGB', (width_size, max_height))
+                rgb = source if source.mode == 'RGB' else source.convert('RGB')
+                img = rgb.resize((width_size, max_height), Image.Resampling.LANCZOS)
+                if rgb is not source:
+                    rgb.close()
+            del image_data
+            await image_cache.save_variant(sha, max_height, img)
+            return img
         except Exception as e:
             self.logger.warning(f"Failed to fetch image from {url}: {e}")
             return None
 
+    async def _download_image(self, url: str, meta: dict | None) -> str | None:
+        """
+        Downloads an image into the cache, or revalidates the cached copy, and returns its content hash.
+        """
+        await self.create_session()
+        assert self._session is not None
+        try:
+            async with self._session.get(url, headers=image_cache.validators(meta)) as response:
+                if response.status == 304 and meta:
+                    await image_cache.revalidated(url, meta)
+                    return meta['sha']
+                if response.status != 200:
+                    return None
+                image_data = await response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if meta:
+                self.logger.info("Using cached image for %s", url)
+                return meta['sha']
+            raise
+        return await image_cache.store(url, image_data, etag, last_modified)
+
 
     # MARK: make_gif_image
-    async def make_gif_image(self, wide: bool = False, status: bool | None = None, size: int = 1) -> IO[bytes] | None:
-        """Creates a GIF and MP4 asynchronously."""
+    async def make_gif_image(self, wide: bool = False, status: bool | None = None, size: int = 1, video: bool = False) -> IO[bytes] | None:
+        """Creates a GIF, or an MP4 when `video` is set, asynchronously."""
         if status is None : status = True
 
         if not self.data:
@@ -343,69 +498,48 @@ class Store:
 
         images_key = 'wideImage' if wide else 'image'
 
-        image_futures = [
-            self.fetch_image(game[images_key], 500) for game in self.data if game['activeDeal'] is status
-        ]
-        image_bytes_list = await asyncio.gather(*image_futures)
-
-        image_bytes_list = [img_bytes for img_bytes in image_bytes_list if img_bytes]
-
-        if not image_bytes_list:
-            return None
-
-        # Run image processing in a separate thread (non-blocking)
-        arr, arr_mp4 = await asyncio.to_thread(self.process_images, image_bytes_list, size)
-
-        for b in image_bytes_list:
-            try:
-                b.close()
-            except:
-                pass
-
-        del image_bytes_list
-
-        self.video = arr_mp4  # Store the MP4 buffer
-        return arr
-
-    def process_images(self, image_list, size) -> tuple[IO[bytes], IO[bytes]]:
-        arr = io.BytesIO()
-        arr_mp4 = io.BytesIO()
-        resized_imgs = []
-
-        if not image_list:
-            return arr, arr_mp4
-
-        def make_divisible_by_16(width, height):
-            return (width + 15) // 16 * 16, (height + 15) // 16 * 16
+        # Fetched at the final height, so the renderer doesn't resample the frames again
+        image_bytes_list = await self.fetch_images(
+            [game for game in self.data if game['activeDeal'] is status], images_key, 500 // size
+        )
 
         try:
-            target_width = min(img.width for img in image_list) // size
-            target_height = min(img.height for img in image_list) // size
-            video_width, video_height = make_divisible_by_16(target_width, target_height)
-            resized_imgs = [img.resize((video_width, video_height)) for img in image_list]
-
-            resized_imgs[0].save(fp=arr, format='GIF', append_images=resized_imgs[1:], save_all=True, duration=2000, loop=0)
-            arr.seek(0)
-
-            # Create MP4
-            writer = imageio.get_writer(arr_mp4, fps=5, format='mp4') # type: ignore
-            frame_duration = 3
-            for img in resized_imgs:
-                for _ in range(frame_duration * 5): # 3 seconds @ 5 fps
-                    writer.append_data(np.array(img))
-            writer.close()
-            arr_mp4.seek(0)
-        
+            return await self.render_animation(image_bytes_list, video)
         finally:
-            # Close all image objects
-            for img in resized_imgs:
+            for b in image_bytes_list:
                 try:
-                    img.close()
-                except Exception:
+                    b.close()
+                except:
                     pass
-            del resized_imgs
-        
-        return arr, arr_mp4
+            del image_bytes_list
+
+    async def fetch_images(self, games: list[dict], key: str, height: int) -> list[Image.Image]:
+        """
+        Fetches the `key` image of every game, games whose image can't be fetched are left out.
+        """
+        images = await asyncio.gather(*(self.fetch_image(game[key], height) for game in games if game.get(key)))
+        return [img for img in images if img]
+
+    async def render_animation(self, images: list[Image.Image], video: bool = False) -> IO[bytes] | None:
+        """
+        Encodes the images as a GIF, or as an MP4 when `video` is set.
+        """
+        if not images:
+            return None
+
+        # Encode in the renderer process pool, so the GIL stays free for the bot
+        media, gif_stats = await _renderer.render(_renderer.encode_animation, [images], 1, video)
+        if gif_stats:
+            self.log_gif_stats(gif_stats)
+        return io.BytesIO(media)
+
+    def log_gif_stats(self, stats: dict) -> None:
+        self.logger.info("GIF for %s: %s bytes, %s bytes saved", self.name, stats.get('bytes'), stats.get('saved'), extra={
+            '_baseline_bytes': stats.get('baseline_bytes'),
+            '_baseline_estimated': stats.get('baseline_estimated'),
+            '_colors': stats.get('colors'),
+            '_scale': stats.get('scale')
+        })
 
     #MARK: get_date
     def get_date(self, data, status='start', returnAsRelative=False) -> str | None:
@@ -438,9 +572,85 @@ class Store:
             return f"{month} {day}"
         return None
 
-    async def set_images(self) -> None:
-        self.image = self.image_twitter = await self.make_gif_image()
+    async def render_variant(self, variant: MediaVariant) -> IO[bytes] | None:
+        """
+        Renders a media variant, stores with their own layouts override this.
+        Twitter gets the Discord GIF, the video shows the same images.
+        """
+        if variant == 'twitter':
+            return await self.media('discord')
+        return await self.make_gif_image(video=variant == 'video')
+
 
+    # MARK: media
+    def media_key(self) -> str | None:
+        """
+        Returns a hash of the deal set and its artwork urls, used to identify the rendered media.
+        """
+        if not self.data:
+            return None
+        games = sorted(
+            (str(game.get('title')), bool(game.get('activeDeal')), str(game.get('image')), str(game.get('wideImage')))
+            for game in self.data
+        )
+        return hashlib.sha1(json.dumps([self.name, games]).encode()).hexdigest()
+
+    async def media(self, variant: MediaVariant) -> IO[bytes] | None:
+        """
+        Returns a media variant of the current deals.
+
+        Variants are only rendered the first time a consumer asks for them, so the ones
+        for disabled clients never are. Concurrent requests share one render and the
+        saved variants of the same deals are reused.
+        """
+        attribute = MEDIA_ATTRIBUTES[variant]
+        if getattr(self, attribute) is not None:
+            return getattr(self, attribute)
+
+        future = self._media_futures.get(variant)
+        if future is None:
+            future = asyncio.ensure_future(self._load_media(variant, self.media_key()))
+            self._media_futures[variant] = future
+
+            def forget_failed(done: asyncio.Future) -> None:
+                # Let the next consumer retry
+                if (done.cancelled() or done.exception()) and self._media_futures.get(variant) is done:
+                    del self._media_futures[variant]
+            future.add_done_callback(forget_failed)
+
+        return await asyncio.shield(future)
+
+    async def _load_media(self, variant: MediaVariant, media_key: str | None) -> IO[bytes] | None:
+        media = None
+        if media_key:
+            try:
+                media = (await asyncio.to_thread(database.Database.get_media, media_key, variant)).get(variant)
+            except Exception:
+                self.logger.warning("Failed to load saved %s media for %s", variant, self.name)
+
+        if media is not None:
+            self.logger.info("Reusing saved %s media for %s", variant, self.name)
+        else:
+            media = await self.render_variant(variant)
+            # The base stores tweet the Discord GIF, that one is already saved
+            shared = variant == 'twitter' and media is self.image
+            if media_key and isinstance(media, io.BytesIO) and not shared:
+                try:
+                    await asyncio.to_thread(database.Database.save_media, self.name, media_key, {variant: media.getvalue()})
+                except Exception:
+                    self.logger.warning("Failed to save %s media for %s", variant, self.name)
+
+        # The deals may have changed while rendering
+        if media_key == self.media_key():
+            setattr(self, MEDIA_ATTRIBUTES[variant], media)
+        return media
+
+    def reset_media(self) -> None:
+        """
+        Drops the media of the previous deals, it's rendered again when it's next needed.
+        """
+        self.image = self.image_twitter = self.video = None
+        self._media_futures.clear()
 
     def _normilize_title(self, data) -> set:
         return set(
@@ -448,6 +658,15 @@ class Store:
             for game in data if game.get('activeDeal')
         )
 
+    def deal_hash(self) -> str | None:
+        """
+        Returns a stable hash of the current active deals, used to identify a store update.
+        """
+        if not self.data:
+            return None
+        titles = "\n".join(sorted(self._normilize_title(self.data)))
+        return hashlib.sha1(f"{self.name}\n{titles}".encode()).hexdigest()
+
     # MARK: verify_new_notification
     def verify_new_notification(self, potential_deal) -> bool:
         """
@@ -515,18 +734,20 @@ class Store:
                 try:
                     self.data = json_data
                     await self.create_checkout_url()
-                    await self.set_images()
+                    self.reset_media()
+                    # Discord always posts the GIF, the other variants wait for their client
+                    await self.media('discord')
                 except:
                     self.data, self.checkout_url, self.image, self.image_cdn, self.image_twitter = state_backup
                     raise
 
-                return self.verify_new_notification(json_data)
+                return await asyncio.to_thread(self.verify_new_notification, json_data)
             return False
 
         # Theres no data online
         elif not json_data:
             self.data = None
-            self.image = self.image_twitter = None
+            self.reset_media()
             return False
         elif has_active and not self.data:
             for game in json_data:
@@ -535,11 +756,12 @@ class Store:
             self.data = json_data
             try:
                 await self.create_checkout_url()
-                await self.set_images()
+                self.reset_media()
+                await self.media('discord')
             except:
                 self.data, self.checkout_url, self.image, self.image_cdn, self.image_twitter = None, None, None, None, None
                 raise
-            return self.verify_new_notification(json_data)
+            return await asyncio.to_thread(self.verify_new_notification, json_data)
         return False
     
     # MARK: create_checkout_url
@@ -1,12 +1,17 @@
 from datetime import datetime, timezone
-from typing import Self
+from typing import IO, Self
 import io, os
 import asyncio
 from PIL import Image
 import gc
 
 from utils.makejson import GameDeal, append_game_deal 
-from stores._store import Store
+from stores._store import NOT_MODIFIED, Store
+from stores import _renderer
+from utils.database import Database
+
+COMBINED_HEIGHT = 300
+TWITTER_HEIGHT = 250
 
 
 class Main(Store):
@@ -29,6 +34,7 @@ class Main(Store):
         self.checkout_url_template = 'https://store.epicgames.com/purchase?{slugs}#/free-checkout'
         self.checkout_url = None
         self.giveawayUrl = 'https://store.epicgames.com/en-US/free-games'
+        self._checkout_slugs: dict[str, str] = {}
         
         super().__init__(
             name = name,
@@ -51,6 +57,12 @@ class Main(Store):
 
         json_data = []
         game_list = pages['data']['Catalog']['searchStore']['elements']
+        checkout_slugs = await self.get_checkout_offers([
+            game['offerMappings'][0]['pageSlug'] for game in game_list
+            if game['promotions'] is not None
+            and game['promotions']['promotionalOffers']
+            and game['price']['totalPrice']['fmtPrice']['discountPrice'] == "0"
+        ])
         for game in game_list:
 
             if game['promotions'] is not None:
@@ -96,7 +108,7 @@ class Main(Store):
                         startDate = datetime.strptime(offer['startDate'], "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
                         endDate = datetime.strptime(offer['endDate'], "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
                         product_slug = game['offerMappings'][0]['pageSlug']
-                        checkout_slug = await self.get_checkout_offer(product_slug)
+                        checkout_slug = checkout_slugs[product_slug]
                         game_data = GameDeal(
                             name=game_name,
                             url=game_url,
@@ -130,94 +142,95 @@ class Main(Store):
         return await self.compare(json_data)
     
 
-    # MARK: get checkout offer
-    async def get_checkout_offer(self, product_slug):
-        url = (
+    # MARK: get checkout offers
+    def checkout_offer_url(self, product_slug: str) -> str:
+        return (
             'https://store.epicgames.com/graphql'
             '?operationName=getMappingByPageSlug'
             f'&variables={{"pageSlug":"{product_slug}","locale":"en-US"}}'
             '&extensions={"persistedQuery":{"version":1,"sha256Hash":"781fd69ec8116125fa8dc245c0838198cdf5283e31647d08dfa27f45ee8b1f30"}}'
         )
-        response = (await self.request_data_playwright(url, return_response=True))['response']
-        data = self.cleanup_json_response(response).get('data')
-        
-        assert data is not None
-        namespace = data.get('StorePageMapping').get('mapping').get('mappings').get('offer').get('namespace')
-        id = data.get('StorePageMapping').get('mapping').get('mappings').get('offer').get('id') 
 
-        return  f"offers=1-{namespace}-{id}"
+    def parse_checkout_offer(self, response: str | None) -> str | None:
+        data = self.cleanup_json_response(response).get('data') if response else None
+        try:
+            offer = data['StorePageMapping']['mapping']['mappings']['offer'] # type: ignore
+            return f"offers=1-{offer['namespace']}-{offer['id']}"
+        except (TypeError, KeyError):
+            return None
+
+    async def get_checkout_offers(self, product_slugs: list[str]) -> dict[str, str]:
+        """
+        Returns the checkout slug of each page slug.
+
+        Slugs are cached in memory and in the database, the ones that aren't are
+        resolved together in one browser session. Raises if any can't be resolved.
+        """
+        checkout_slugs = {slug: self._checkout_slugs[slug] for slug in product_slugs if slug in self._checkout_slugs}
+        missing = [slug for slug in dict.fromkeys(product_slugs) if slug not in checkout_slugs]
+        if missing:
+            checkout_slugs.update(await asyncio.to_thread(Database.get_checkout_slugs, missing))
+            missing = [slug for slug in missing if slug not in checkout_slugs]
+
+        if missing:
+            self.logger.info("Resolving %s checkout slugs", len(missing))
+            responses = await self.request_pages_playwright([self.checkout_offer_url(slug) for slug in missing])
+            resolved = {}
+            for slug in missing:
+                checkout_slug = self.parse_checkout_offer(responses.get(self.checkout_offer_url(slug)))
+                if checkout_slug:
+                    resolved[slug] = checkout_slug
+            if resolved:
+                await asyncio.to_thread(Database.save_checkout_slugs, resolved)
+            checkout_slugs.update(resolved)
+
+        self._checkout_slugs.update(checkout_slugs)
+        unresolved = [slug for slug in product_slugs if slug not in checkout_slugs]
+        if unresolved:
+            raise ValueError(f"Failed to resolve checkout slugs: {', '.join(unresolved)}")
+        return checkout_slugs
 
 
     #MARK: combined GIF
-    async def make_gif_image(self, wide:bool=False, status: bool | None = None, size: int = 1):
+    async def render_variant(self, variant) -> IO[bytes] | None:
         """
-        Generates a gif from the given list of images
+        Discord gets the "free now | up next" pairs, or only the free games when there's
+        nothing up next. Twitter and the video get the wide images of the free games.
+        Each image is fetched at the height it's shown at, so it's resampled once.
         """
-        if not self.data : return
-        arr = io.BytesIO()
-        curr_images, next_images, combined_images = [], [], []
+        if not self.data:
+            return None
 
         active_games = [game for game in self.data if game['activeDeal']]
-        future_games = [game for game in self.data if not game['activeDeal']]
-
-        all_have_tall_img = all(game.get('image') for game in self.data)
-
-        if (all_have_tall_img):
-            image_active = [self.fetch_image(game['image']) for game in active_games]
-            image_future = [self.fetch_image(game['image']) for game in future_games]
-        else:
-            image_active = [self.fetch_image(game['wideImage']) for game in active_games]
-            image_future = [self.fetch_image(game['wideImage']) for game in future_games]
-        
-        active_images, future_images = await asyncio.gather(
-            asyncio.gather(*image_active),
-            asyncio.gather(*image_future)
-        )
 
-        curr_images = [img for img in active_images if img]
-        next_images = [img for img in future_images if img]
-
-        if (not next_images or status):
-            return await super().make_gif_image(wide, status, size)
+        if variant != 'discord':
+            twitter_images = await self.fetch_images(active_games, 'wideImage', TWITTER_HEIGHT)
+            try:
+                return await self.render_animation(twitter_images, video=variant == 'video')
+            finally:
+                for img in twitter_images:
+                    img.close()
 
-        if len(curr_images) >= len(next_images):
-            for index, image in enumerate(curr_images):
-                if index < len(next_images):
-                    new_image = Image.new('RGB', (image.size[0] + next_images[index].size[0], image.size[1]), 0)
-                    new_image.paste(image, (0, 0))
-                    new_image.paste(next_images[index], (image.size[0], 0))
-                    combined_images.append(new_image)
-                else:
-                    new_image = Image.new('RGB', (image.size[0] + next_images[len(next_images) - 1].size[0], image.size[1]), 0)
-                    new_image.paste(image, (0, 0))
-                    new_image.paste(next_images[len(next_images) - 1], (image.size[0], 0))
-                    combined_images.append(new_image)
-        else:
-            for index, image in enumerate(next_images):
-                if index < len(curr_images):
-                    new_image = Image.new('RGB', (curr_images[index].size[0] + next_images[index].size[0], image.size[1]), 0)
-                    new_image.paste(curr_images[index], (0, 0))
-                    new_image.paste(image, (curr_images[index].size[0], 0))
-                    combined_images.append(new_image)
-                else:
-                    new_image = Image.new('RGB', (curr_images[len(curr_images) - 1].size[0] + image.size[0], image.size[1]), 0)
-                    new_image.paste(curr_images[len(curr_images) - 1], (0, 0))
-                    new_image.paste(image, (curr_images[len(curr_images) - 1].size[0], 0))
-                    combined_images.append(new_image)
+        future_games = [game for game in self.data if not game['activeDeal']]
+        images_key = 'image' if all(game.get('image') for game in self.data) else 'wideImage'
+        frame_height = COMBINED_HEIGHT if future_games else 500
 
-        combined_images[0].save(arr, format='GIF', append_images=combined_images[1:], save_all=True, duration=2000, loop=0)
-        arr.seek(0)
-        
-        for img in curr_images + next_images + combined_images:
-            try:
+        curr_images, next_images = await asyncio.gather(
+            self.fetch_images(active_games, images_key, frame_height),
+            self.fetch_images(future_games, images_key, frame_height)
+        )
+        try:
+            if curr_images and next_images:
+                # Compositing and encoding run in the renderer process pool
+                gif, gif_stats = await _renderer.render(_renderer.compose_epic, [curr_images, next_images], COMBINED_HEIGHT)
+                self.log_gif_stats(gif_stats)
+                return io.BytesIO(gif)
+            return await self.render_animation(curr_images)
+        finally:
+            for img in curr_images + next_images:
                 img.close()
-            except Exception:
-                pass
-        
-        del curr_images, next_images, combined_images
-        gc.collect()
-
-        return arr
+            del curr_images, next_images
+            gc.collect()
 
     #MARK: Scheduler
     async def scheduler(self) -> Self:
@@ -257,9 +270,6 @@ class Main(Store):
             await asyncio.sleep(self.scheduler_time)
             return self
 
-    async def set_images(self) -> None:
-        self.image = await self.make_gif_image()
-        self.image_twitter = await self.make_gif_image(True, status=True, size=2)
 
     #MARK: get
     async def get(self) -> bool:
@@ -269,7 +279,10 @@ class Main(Store):
         returns 0 if nothing changed 
         returns 1 if new data was found
         """
-        if await self.process_data(await self.request_data(self.page)):
+        pages = await self.request_data(self.page, conditional=True)
+        if pages is NOT_MODIFIED:
+            return False
+        if await self.process_data(pages):
             return True
         return False
 
@@ -2,7 +2,6 @@ import asyncio
 import json
 import os
 from datetime import datetime
-from urllib.request import urlopen, Request
 
 from utils.makejson import GameDeal, append_game_deal
 from stores._store import Store
@@ -72,11 +71,14 @@ class Main(Store):
             return
 
 
-    def create_urls(self):
+    async def create_urls(self):
         '''
         Creates all the urls for data
         '''
-        total_number_of_pages = json.loads(urlopen(self.url).read().decode())['totalPages']
+        first_page = await self.request_data(self.url)
+        if not first_page:
+            return
+        total_number_of_pages = first_page['totalPages']
         for i in range(1, total_number_of_pages + 1):
             url = f'https://www.gog.com/games/ajax/filtered?mediaType=game&page={i}&price=discounted'
             self.urls.append(url)
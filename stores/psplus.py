@@ -1,7 +1,7 @@
 import asyncio, os
 from datetime import datetime
 
-from stores._store import Store
+from stores._store import NOT_MODIFIED, Store
 from utils.makejson import GameDeal, append_game_deal
 
 
@@ -24,8 +24,8 @@ class Main(Store):
         """
         get data for psplus
         """
-        data = await self.request_data(self.url, mode="html")
-        if data is None : return
+        data = await self.request_data(self.url, mode="html", conditional=True)
+        if data is None or data is NOT_MODIFIED: return
 
         monthly_games_section = data.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " cmp-experiencefragment--wn-latest-monthly-games-content ")]')[0]
         games= monthly_games_section.xpath('.//div[starts-with(@class, "box")]')
@@ -1,10 +1,13 @@
 import asyncio, os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup, Tag
 
-from stores._store import Store
+from stores._store import NOT_MODIFIED, Store
 from utils.makejson import GameDeal, append_game_deal
+from utils import environment
+from utils.database import Database
 
 
 class Main(Store):
@@ -27,8 +30,9 @@ class Main(Store):
                  'query=&start=0&count=50&dynamic_data=&sort_by=_ASC&'
                  'maxprice=free&snr=1_7_7_2300_7&specials=1&infinite=1')
         )
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
 
-    async def _parse_end_date(self, soup: BeautifulSoup) -> datetime | None:
+    def _parse_end_date(self, soup: BeautifulSoup) -> datetime | None:
         end_date = soup.select_one("p.game_purchase_discount_quantity")
 
         if not end_date: return None
@@ -43,62 +47,120 @@ class Main(Store):
             self.logger.warning("Could not parse date: %s", end_date_text)
             return None
 
+    async def _request_limited(self, url: str, mode='json'):
+        """
+        request_data bounded by STEAM_HOST_CONCURRENCY requests in flight per host
+        """
+        host = urlparse(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(environment.STEAM_HOST_CONCURRENCY))
+        async with limit:
+            return await self.request_data(url, mode=mode)
+
+    def _parse_game_page(self, page: str) -> tuple[datetime | None, str | None, bool]:
+        """
+        Returns the end date, image and whether profile features are limited
+        """
+        soup = BeautifulSoup(page, 'html.parser')
+        end_date_object = self._parse_end_date(soup)
+        meta = soup.find("meta", property="og:image")
+        game_image = str(meta.get("content")) if isinstance(meta, Tag) else None
+        features = soup.find("div", class_="game_area_features_list_ctn")
+        profile_features_limited = False
+        if isinstance(features, Tag):
+            profile_features_limited = any(
+                hasattr(feature, "text") and "Profile Features Limited" in feature.text
+                for feature in features.contents
+            )
+        return end_date_object, game_image, profile_features_limited
+
+    async def _fetch_app(self, app_id: str, game_url: str) -> tuple[dict, bool]:
+        """
+        Fetches the appdetails and store page of an appid.
+        Returns what could be fetched and whether both requests succeeded,
+        a partial result is used for this run but isn't cached.
+        """
+        details, game_details = await asyncio.gather(
+            self._request_limited(f'{self.gamesInfoApi}={app_id}'),
+            self._request_limited(game_url, mode='text')
+        )
+        app = {'product_type': (details or {}).get(app_id, {}).get('data', {}).get('type')}
+        if game_details:
+            end_date, image, profile_features_limited = await asyncio.to_thread(self._parse_game_page, game_details)
+            app.update(end_date=end_date, image=image, profile_features_limited=profile_features_limited)
+        return app, bool(details and game_details)
+
+    def _expires(self, app: dict) -> datetime:
+        expires = datetime.now(timezone.utc) + timedelta(seconds=environment.STEAM_ENRICHMENT_TTL)
+        if app.get('end_date'):
+            # End dates are parsed without a timezone
+            end_date = app['end_date'] if app['end_date'].tzinfo else app['end_date'].replace(tzinfo=timezone.utc)
+            expires = min(expires, end_date)
+        return expires
+
+    async def _enrich(self, game: Tag, cached_apps: dict, fetched_apps: dict) -> GameDeal | None:
+        """
+        Builds the deal of a search result from its appdetails and store page,
+        appids in `cached_apps` are not requested again and new ones are added to `fetched_apps`
+        """
+        title_tag = game.select_one("span.title")
+        game_name = title_tag.text.strip() if title_tag else None
+        game_url = str(game['href'])
+        img = game.select_one(".search_capsule img")
+        game_image = str(img.get("src")) if img else None
+        app_id = str(game['data-ds-appid'])
+
+        if not game_name or (not game_url) or (not game_image):
+            return None
+
+        app = cached_apps.get(app_id)
+        if app is None:
+            app, complete = await self._fetch_app(app_id, game_url)
+            if complete:
+                fetched_apps[app_id] = {**app, 'expires': self._expires(app)}
+
+        end_date_object = app.get('end_date')
+        if end_date_object is not None:
+            # Mongo returns the naive end date as UTC
+            end_date_object = end_date_object.replace(tzinfo=None)
+        profile_features_limited = app.get('profile_features_limited', False)
+        product_type = app.get('product_type')
+        game_image = app.get('image') or game_image
+
+        return GameDeal(
+            name=game_name,
+            url=game_url,
+            active_deal=True,
+            image=str(game_image),
+            wide_image=str(game_image),
+            offer_until=end_date_object,
+            product_type='low_quality' if profile_features_limited else product_type
+        )
+
     #MARK: process_data 
     async def process_data(self) -> bool:
         """
         Steam process data
         """
         json_data = []
-        data = await self.request_data(self.url, mode='json')
-        if not data or data.get('total_count', 0) == 0:
+        data = await self.request_data(self.url, mode='json', conditional=True)
+        if data is NOT_MODIFIED or not data or data.get('total_count', 0) == 0:
             return False
         
         soup = BeautifulSoup(data['results_html'], 'html.parser')
-        games = soup.find_all("a", class_="search_result_row ds_collapse_flag")
+        games = [game for game in soup.find_all("a", class_="search_result_row ds_collapse_flag") if isinstance(game, Tag)]
 
-        # Get new deals
-        for game in games:
-            
-            if not isinstance(game, Tag):
-                continue
-
-            title_tag = game.select_one("span.title")
-            game_name = title_tag.text.strip() if title_tag else None
-            game_url = str(game['href'])
-            img = game.select_one(".search_capsule img")
-            game_image = str(img.get("src")) if img else None
-            app_id = game['data-ds-appid']
-            details = await self.request_data(f'{self.gamesInfoApi}={app_id}') or {}
-            product_type = details.get(app_id, {}).get('data', {}).get('type')
-
-            if not game_name or (not game_url) or (not game_image):
-                continue
-
-            game_details = await self.request_data(game_url, mode='text')
-            end_date_object = None
-            profile_features_limited = False
-            if game_details:
-                soup = BeautifulSoup(game_details, 'html.parser')
-                end_date_object = await self._parse_end_date(soup)
-                meta = soup.find("meta", property="og:image")
-                game_image = str(meta.get("content")) if isinstance(meta, Tag) else game_image
-                features = soup.find("div", class_="game_area_features_list_ctn")
-                if isinstance(features, Tag):
-                    profile_features_limited = any(
-                        hasattr(feature, "text") and "Profile Features Limited" in feature.text
-                        for feature in features.contents
-                    )
-
-            game_data = GameDeal(
-                name=game_name,
-                url=game_url,
-                active_deal=True,
-                image=str(game_image),
-                wide_image=str(game_image),
-                offer_until=end_date_object,
-                product_type='low_quality' if profile_features_limited else product_type
-            )
-            json_data = append_game_deal(json_data, game_data)
+        app_ids = [str(game['data-ds-appid']) for game in games]
+        cached_apps = await asyncio.to_thread(Database.get_steam_apps, app_ids)
+        fetched_apps = {}
+
+        # Enrich every result concurrently, gather keeps the search order
+        for game_data in await asyncio.gather(*(self._enrich(game, cached_apps, fetched_apps) for game in games)):
+            if game_data is not None:
+                json_data = append_game_deal(json_data, game_data)
+
+        self.logger.debug("Steam enrichment: %s cached, %s fetched", len(cached_apps), len(fetched_apps))
+        if fetched_apps:
+            await asyncio.to_thread(Database.save_steam_apps, fetched_apps)
             
         return await self.compare(json_data)
 
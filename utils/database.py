@@ -1,9 +1,10 @@
 import io
 import os
-from pymongo import MongoClient
+import gridfs
+from pymongo import DeleteMany, MongoClient, UpdateOne
 from dotenv import load_dotenv
 from utils import environment
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 logger = environment.logging.getLogger("bot.database")
 
@@ -12,6 +13,9 @@ class Database(object):
     load_dotenv(override=True)
     CONNECTION_STRING = os.getenv('DB_CONNECTION_STRING')
     _client = None
+    OUTBOX_TTL = 7 * 24 * 3600
+    MEDIA_RETENTION = timedelta(days=30)
+    CHECKOUT_SLUG_TTL = 30 * 24 * 3600
 
 
     @classmethod
@@ -31,6 +35,17 @@ class Database(object):
             cls.feedback = cls._client['feedback'+dev]
             cls.social = cls.servers.social
             cls.images = cls.deals.images
+            cls.media = gridfs.GridFSBucket(cls.deals, bucket_name='media')
+            cls.deals['media.files'].create_index('metadata.key')
+            cls.outbox = cls.servers.outbox
+            cls.outbox.create_index('created', expireAfterSeconds=cls.OUTBOX_TTL)
+            cls.outbox.create_index([('store', 1), ('cluster', 1), ('status', 1)])
+            cls.updates = cls.deals.updates
+            cls.cdn = cls.deals.cdn
+            cls.steam_apps = cls.deals.steam_apps
+            cls.steam_apps.create_index('expires', expireAfterSeconds=0)
+            cls.checkout_slugs = cls.deals.checkout_slugs
+            cls.checkout_slugs.create_index('updated', expireAfterSeconds=cls.CHECKOUT_SLUG_TTL)
 
 
     @staticmethod
@@ -56,6 +71,10 @@ class Database(object):
         '''
         Inserts or updates the discord server database 
         according to the server id field ['server':'xxxxxxx']
+
+        The 'webhook' field is the full webhook url, which contains the webhook token
+        in plaintext. Anyone with read access to the servers collection can post
+        through every stored webhook, so treat it as a secret.
         '''
         for server_info in data:
             filter_criteria = {"server":server_info['server']}
@@ -173,6 +192,41 @@ class Database(object):
         else:
             logger.debug('Module %s has no image to upload', store.name)
 
+    @staticmethod
+    def save_media(store_name, media_key, variants) -> None:
+        '''
+        Saves the rendered media of a store to GridFS.
+        variants is a dict of {'discord' | 'twitter' | 'video': bytes}
+        Media of other deal sets older than MEDIA_RETENTION is removed.
+        '''
+        for variant, data in variants.items():
+            filename = f'{media_key}.{variant}'
+            if Database.deals['media.files'].find_one({'filename': filename}, {'_id': 1}):
+                continue
+            Database.media.upload_from_stream(filename, data, metadata={
+                'store': store_name,
+                'key': media_key,
+                'variant': variant
+            })
+
+        cutoff = datetime.now(timezone.utc) - Database.MEDIA_RETENTION
+        for old_file in Database.media.find({'metadata.store': store_name, 'metadata.key': {'$ne': media_key}, 'uploadDate': {'$lt': cutoff}}):
+            Database.media.delete(old_file._id)
+
+    @staticmethod
+    def get_media(media_key, variant=None) -> dict:
+        '''
+        Returns the saved media variants of a deal set as {variant: BytesIO}
+        Only the given variant is loaded when variant is set.
+        '''
+        query = {'metadata.key': media_key}
+        if variant:
+            query['metadata.variant'] = variant
+        return {
+            media_file.metadata['variant']: io.BytesIO(media_file.read())
+            for media_file in Database.media.find(query)
+        }
+
     @staticmethod
     def get_image(name, row="data"):
         '''
@@ -202,3 +256,225 @@ class Database(object):
             Database.servers['social'].update_one(filter_criteria, {"$set":{"followers":social.get('followers_count')}}, upsert=True)
         else:
             logger.warning("No social data provided, skipping update.")
+
+
+    @staticmethod
+    def outbox_key(store_name, deal_hash, server_id) -> str:
+        '''
+        Idempotent send key of a single notification job
+        '''
+        return f"{store_name}:{deal_hash}:{server_id}"
+
+    @staticmethod
+    def replace_notifications(store_name, deal_hash, server_ids) -> None:
+        '''
+        Starts a fresh fan-out: creates a pending outbox job for every server and then removes
+        the jobs of older updates, in one ordered write. If it's interrupted in between, the
+        leftover jobs belong to another deal hash and are dropped when the fan-out resumes.
+        Only the jobs of this cluster are touched, the other clusters own their guilds' jobs.
+        '''
+        now = datetime.now(timezone.utc)
+        operations: list = [
+            UpdateOne(
+                {'_id': Database.outbox_key(store_name, deal_hash, server_id)},
+                {'$set': {
+                    'store': store_name,
+                    'deal_hash': deal_hash,
+                    'server': server_id,
+                    'cluster': environment.CLUSTER_ID,
+                    'status': 'pending',
+                    'created': now
+                }},
+                upsert=True
+            )
+            for server_id in server_ids
+        ]
+        operations.append(DeleteMany({'store': store_name, 'cluster': environment.CLUSTER_ID, 'deal_hash': {'$ne': deal_hash}}))
+        Database.outbox.bulk_write(operations, ordered=True)
+
+    @staticmethod
+    def has_notifications(store_name, deal_hash) -> bool:
+        '''
+        True if this cluster has outbox jobs for the store update, in any status.
+        '''
+        return Database.outbox.find_one(
+            {'store': store_name, 'cluster': environment.CLUSTER_ID, 'deal_hash': deal_hash}, {'_id': 1}
+        ) is not None
+
+    @staticmethod
+    def pending_notifications(store_name, deal_hash) -> set:
+        '''
+        Returns the server ids that still have to be notified for a store update.
+        '''
+        jobs = Database.outbox.find(
+            {'store': store_name, 'cluster': environment.CLUSTER_ID, 'deal_hash': deal_hash, 'status': 'pending'},
+            {'server': 1}
+        )
+        return {job['server'] for job in jobs}
+
+    @staticmethod
+    def complete_notifications(keys, status='sent') -> None:
+        '''
+        Marks outbox jobs as done, status is either "sent" or "failed".
+        '''
+        if keys:
+            Database.outbox.update_many(
+                {'_id': {'$in': list(keys)}},
+                {'$set': {'status': status, 'completed': datetime.now(timezone.utc)}}
+            )
+
+    @staticmethod
+    def drop_stale_notifications(store_name, deal_hash) -> None:
+        '''
+        Removes pending jobs of older store updates, they were superseded by the current deals.
+        '''
+        result = Database.outbox.delete_many(
+            {'store': store_name, 'cluster': environment.CLUSTER_ID, 'deal_hash': {'$ne': deal_hash}, 'status': 'pending'}
+        )
+        if result.deleted_count:
+            logger.info('Dropped %s stale notification jobs for %s', result.deleted_count, store_name)
+
+
+    @staticmethod
+    def publish_store_update(store_name, deal_hash) -> None:
+        '''
+        Announces a new store update to the other processes of the cluster.
+        '''
+        Database.updates.update_one(
+            {'_id': store_name},
+            {'$set': {'deal_hash': deal_hash, 'published': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    @staticmethod
+    def mark_fanout_owed(store_name, deal_hash) -> None:
+        '''
+        Records that this cluster owes the fan-out of a store update. Written before the
+        deals are saved, so a restart at any point after the save still sends it.
+        '''
+        cluster = environment.CLUSTER_ID
+        Database.updates.update_one(
+            {'_id': store_name},
+            {'$set': {f'owed.{cluster}': deal_hash, f'handled.{cluster}': None}},
+            upsert=True
+        )
+
+    @staticmethod
+    def fanout_owed(store_name, deal_hash) -> bool:
+        '''
+        True if deal_hash was published or marked owed for this cluster and this cluster hasn't handled it.
+        '''
+        update = Database.updates.find_one({'_id': store_name})
+        cluster = str(environment.CLUSTER_ID)
+        return bool(
+            update
+            and deal_hash in (update.get('deal_hash'), update.get('owed', {}).get(cluster))
+            and update.get('handled', {}).get(cluster) != deal_hash
+        )
+
+    @staticmethod
+    def get_store_updates() -> dict:
+        '''
+        Returns the latest published update of every store as {store: {'deal_hash', 'handled'}},
+        where handled maps a cluster id to the last deal hash that cluster notified for.
+        '''
+        return {update['_id']: update for update in Database.updates.find()}
+
+    @staticmethod
+    def mark_update_handled(store_name, deal_hash) -> None:
+        '''
+        Records that this cluster has fanned out the given store update.
+        '''
+        Database.updates.update_one(
+            {'_id': store_name},
+            {'$set': {f'handled.{environment.CLUSTER_ID}': deal_hash}},
+            upsert=True
+        )
+
+    @staticmethod
+    def seed_handled_updates() -> None:
+        '''
+        Marks the updates this cluster has no record of as handled. They were published
+        before the cluster first started, when another process notified its guilds.
+        '''
+        handled = f'handled.{environment.CLUSTER_ID}'
+        Database.updates.update_many(
+            {handled: {'$exists': False}, 'deal_hash': {'$exists': True}},
+            [{'$set': {handled: '$deal_hash'}}]
+        )
+
+
+    @staticmethod
+    def update_delivery_state(states) -> None:
+        '''
+        Saves the consecutive delivery failures and parked flag of servers.
+        states is a dict of {server_id: {'failures': int, 'parked': bool}}
+        '''
+        operations = [UpdateOne({'server': server_id}, {'$set': state}) for server_id, state in states.items()]
+        if operations:
+            Database.servers['discord'].bulk_write(operations, ordered=False)
+
+
+    @staticmethod
+    def set_permission_notice(server_id, timestamp) -> None:
+        '''
+        Saves when a server was last warned about missing permissions.
+        '''
+        Database.servers['discord'].update_one({'server': server_id}, {'$set': {'permission_notice': timestamp}})
+
+
+    @staticmethod
+    def get_cdn_url(content_hash) -> str | None:
+        '''
+        Returns the CDN url of uploaded media by the sha256 of its bytes
+        '''
+        document = Database.cdn.find_one({'_id': content_hash})
+        return document.get('url') if document else None
+
+    @staticmethod
+    def save_cdn_url(content_hash, url) -> None:
+        Database.cdn.update_one(
+            {'_id': content_hash},
+            {'$set': {'url': url, 'updated': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+
+    @staticmethod
+    def get_steam_apps(app_ids) -> dict:
+        '''
+        Returns the cached Steam enrichment of the given appids that hasn't expired, by appid
+        '''
+        documents = Database.steam_apps.find({'_id': {'$in': list(app_ids)}, 'expires': {'$gt': datetime.now(timezone.utc)}})
+        return {document['_id']: document for document in documents}
+
+    @staticmethod
+    def save_steam_apps(apps) -> None:
+        '''
+        Saves the Steam enrichment of appids, apps is a dict of {app_id: {..., 'expires': datetime}}
+        '''
+        operations = [UpdateOne({'_id': app_id}, {'$set': app}, upsert=True) for app_id, app in apps.items()]
+        if operations:
+            Database.steam_apps.bulk_write(operations, ordered=False)
+
+
+    @staticmethod
+    def get_checkout_slugs(page_slugs) -> dict:
+        '''
+        Returns the cached Epic checkout slugs of the given page slugs, by page slug
+        '''
+        documents = Database.checkout_slugs.find({'_id': {'$in': list(page_slugs)}})
+        return {document['_id']: document['checkout_slug'] for document in documents}
+
+    @staticmethod
+    def save_checkout_slugs(checkout_slugs) -> None:
+        '''
+        Saves Epic checkout slugs, checkout_slugs is a dict of {page_slug: checkout_slug}
+        '''
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({'_id': page_slug}, {'$set': {'checkout_slug': checkout_slug, 'updated': now}}, upsert=True)
+            for page_slug, checkout_slug in checkout_slugs.items()
+        ]
+        if operations:
+            Database.checkout_slugs.bulk_write(operations, ordered=False)
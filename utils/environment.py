@@ -12,6 +12,44 @@ DEBUG = (os.getenv('DEBUG', 'True').lower() == 'true')
 DISCORD_DEV_GUILD = os.getenv('DISCORD_DEV_GUILD')
 DISCORD_ADMIN_ACC = os.getenv('DISCORD_ADMIN_ACC')
 NOTIFICATION_BATCH_SIZE = os.getenv('NOTIFICATION_BATCH_SIZE')
+NOTIFICATION_CONCURRENCY = os.getenv('NOTIFICATION_CONCURRENCY')
+NOTIFICATION_RATE_LIMIT = os.getenv('NOTIFICATION_RATE_LIMIT')
+NOTIFICATION_PARK_THRESHOLD = int(os.getenv('NOTIFICATION_PARK_THRESHOLD', '5'))
+# Seconds between two missing-permission warnings to the same server
+PERMISSION_NOTICE_COOLDOWN = int(os.getenv('PERMISSION_NOTICE_COOLDOWN', str(24 * 60 * 60)))
+
+# Cluster mode: CLUSTER_COUNT processes each own the shards where shard_id % CLUSTER_COUNT == CLUSTER_ID
+DISCORD_SHARD_COUNT = int(os.getenv('DISCORD_SHARD_COUNT')) if os.getenv('DISCORD_SHARD_COUNT') else None
+CLUSTER_COUNT = int(os.getenv('CLUSTER_COUNT', '1'))
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', '0'))
+CLUSTER_LEADER = CLUSTER_ID == 0
+CLUSTER_POLL_INTERVAL = int(os.getenv('CLUSTER_POLL_INTERVAL', '60'))
+
+# On-disk cache of store artwork, entries validated less than IMAGE_CACHE_MAX_AGE seconds ago are used without a request
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join('.cache', 'images'))
+IMAGE_CACHE_SIZE_MB = int(os.getenv('IMAGE_CACHE_SIZE_MB', '256'))
+IMAGE_CACHE_MAX_AGE = int(os.getenv('IMAGE_CACHE_MAX_AGE', '3600'))
+
+# Connection pool shared by the store sessions
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))
+HTTP_POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', '8'))
+HTTP_DNS_TTL = int(os.getenv('HTTP_DNS_TTL', '300'))
+HTTP_KEEPALIVE = float(os.getenv('HTTP_KEEPALIVE', '60'))
+
+# Steam store page and appdetails requests in flight per host while enriching search results
+STEAM_HOST_CONCURRENCY = int(os.getenv('STEAM_HOST_CONCURRENCY', '4'))
+# Seconds the enrichment of a Steam appid is reused, it also expires when the deal ends
+STEAM_ENRICHMENT_TTL = int(os.getenv('STEAM_ENRICHMENT_TTL', str(24 * 60 * 60)))
+
+# Processes used to encode GIFs and MP4s
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(min(2, os.cpu_count() or 1))))
+# GIFs over this size get fewer colors and then a smaller size
+GIF_BYTE_BUDGET = int(os.getenv('GIF_BYTE_BUDGET', str(8 * 1024 * 1024)))
+
+# Seconds a callback can hold the event loop before its stack is logged, 0 disables the monitor
+LOOP_MONITOR_THRESHOLD = float(os.getenv('LOOP_MONITOR_THRESHOLD', '0.5'))
+
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
 
 if DEBUG:
     print('\x1b[6;30;42m' + "---::-DEBUG-::---" + '\x1b[0m')
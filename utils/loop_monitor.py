@@ -0,0 +1,62 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from utils import environment, metrics
+
+logger = environment.logging.getLogger("bot.loop_monitor")
+
+
+class LoopMonitor:
+    """
+    Watchdog for callbacks that hold the event loop.
+
+    A task on the loop records a heartbeat every `interval` seconds and a thread checks
+    it. When the heartbeat is late by more than `threshold` the thread logs the stack
+    of the loop thread, which points at the blocking call, and logs the total stall
+    once the loop is back.
+    """
+    def __init__(self, threshold: float, interval: float = 0.1) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._stopped = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            lag = now - self._last_beat - self.interval
+            if lag > 0:
+                metrics.event_loop_lag_seconds.observe(lag)
+            self._last_beat = now
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        stalled_since = None
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            stall = time.monotonic() - last_beat - self.interval
+            if stall > self.threshold and stalled_since != last_beat:
+                stalled_since = last_beat
+                metrics.event_loop_stalls_total.inc()
+                frame = sys._current_frames().get(self._loop_thread_id) if self._loop_thread_id else None
+                logger.warning("Event loop blocked for %.2fs", stall, extra={
+                    '_stack': ''.join(traceback.format_stack(frame)) if frame else None
+                })
+            elif stalled_since is not None and stalled_since != last_beat:
+                logger.info("Event loop was blocked for %.2fs", last_beat - stalled_since - self.interval)
+                stalled_since = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Starts monitoring, must be called from the thread that runs the loop.
+        """
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
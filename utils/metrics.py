@@ -0,0 +1,150 @@
+import bisect
+from abc import ABC, abstractmethod
+from aiohttp import web
+from utils import environment
+
+logger = environment.logging.getLogger("bot.metrics")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SPAN_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _label_key(labels: dict) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metric(ABC):
+    type = ''
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        REGISTRY.append(self)
+
+    @abstractmethod
+    def samples(self) -> list[str]: ...
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, description: str) -> None:
+        super().__init__(name, description)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f'{self.name}{_format_labels(key)} {value}' for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self._values[_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: tuple = LATENCY_BUCKETS) -> None:
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        # [bucket counts..., +Inf count, sum]
+        counts = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {counts[-1]}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {cumulative}')
+        return lines
+
+
+REGISTRY: list[Metric] = []
+
+# MARK: Discord fan-out metrics
+notification_send_seconds = Histogram(
+    'mercurybot_notification_send_seconds',
+    'Time taken to deliver a notification to a single guild'
+)
+notifications_total = Counter(
+    'mercurybot_notifications_total',
+    'Notifications attempted per store and result'
+)
+fanout_span_seconds = Histogram(
+    'mercurybot_fanout_span_seconds',
+    'Time from the first to the last delivery of a store update',
+    buckets=SPAN_BUCKETS
+)
+fanout_throughput = Gauge(
+    'mercurybot_fanout_throughput',
+    'Sends per second achieved by the last fan-out of a store'
+)
+discord_responses_total = Counter(
+    'mercurybot_discord_responses_total',
+    'Discord API responses by status, only 403, 429 and 5xx are counted'
+)
+discord_retries_total = Counter(
+    'mercurybot_discord_retries_total',
+    'Discord requests retried by the library after a 429 or 5xx response'
+)
+subscribed_guilds = Gauge(
+    'mercurybot_subscribed_guilds',
+    'Guilds in the subscription index'
+)
+
+# MARK: Event loop metrics
+event_loop_lag_seconds = Histogram(
+    'mercurybot_event_loop_lag_seconds',
+    'How late the event loop heartbeat ran'
+)
+event_loop_stalls_total = Counter(
+    'mercurybot_event_loop_stalls_total',
+    'Times a callback held the event loop longer than LOOP_MONITOR_THRESHOLD'
+)
+
+
+def render() -> str:
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# MARK: server
+async def serve(port: int) -> web.AppRunner:
+    """
+    Starts the `/metrics` endpoint in the Prometheus text format.
+    """
+    async def metrics_handler(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    logger.info("Metrics available on port %s", port)
+    return runner